@@ -0,0 +1,65 @@
+"""Generator of synthetic marble diagram definitions.
+
+A diagram is made of sections, each one being input observables, an
+operator and an output observable. The first input observable of a section
+emits child observables, each one defined on its own layer below it.
+"""
+import random
+
+item_characters = (
+    'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789')
+descriptions = ['map(i: i*2)', 'filter(i: i > 2)', 'merge', 'window', 'zip']
+
+
+def timeline(rnd, items, child_count=0):
+    """Returns the text of a timeline of items items and child_count child
+    observable items, and the columns of the child observable items.
+    """
+    kinds = ['item'] * items + ['child'] * child_count
+    rnd.shuffle(kinds)
+    text = '-'
+    childs = []
+    for kind in kinds:
+        if kind == 'child':
+            childs.append(len(text))
+            text += '+'
+        else:
+            text += ''.join(
+                rnd.choice(item_characters)
+                for _ in range(rnd.randint(1, 2)))
+        text += '-' * rnd.randint(1, 3)
+    return text, childs
+
+
+def completion(rnd):
+    return rnd.choice('>|*')
+
+
+def generate(sections=1, layers=2, items=10, childs=0, seed=42):
+    """Returns the definition of a diagram of sections operator sections.
+
+    Each section has layers input observables of items items. The first of
+    them also emits childs child observables, each one with items items.
+    """
+    rnd = random.Random(seed)
+    lines = []
+    for _ in range(sections):
+        width = 0
+        for layer in range(layers):
+            text, columns = timeline(
+                rnd, items, child_count=childs if layer == 0 else 0)
+            lines.append(text + completion(rnd))
+            width = max(width, len(text))
+            for column in columns:
+                child, _ = timeline(rnd, items)
+                lines.append(' ' * column + '+' + child[1:] + '|')
+                width = max(width, column + len(child))
+
+        description = rnd.choice(descriptions)
+        lines.append('[{}]'.format(description.center(max(
+            width - 2, len(description) + 2))))
+
+        text, _ = timeline(rnd, items)
+        lines.append(text + completion(rnd))
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,190 @@
+"""Benchmarks of the stages of the rendering of a diagram.
+
+Parsing, creation of the marble, computation of its links and rendering
+are timed separately, on synthetic diagrams of increasing size. Results are
+written as JSON, so that they can be compared between releases:
+
+    python -m benchmarks.run --items 10 100 1000 --output results.json
+
+Raster formats are rendered with matplotlib unless --backend raster is
+given, to compare both backends on the same diagrams.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import dooble
+from dooble.idl import Idl, engines
+from dooble.render import backends
+from dooble.dooble import create_marble_from_ast, default_theme
+from dooble.marble import Observable
+from benchmarks.generate import generate
+
+
+def measure(func, repeat, setup=None):
+    """Calls func repeat times. Returns the statistics of the durations of
+    the calls, and the result of the last one. With setup, func is called
+    with the result of a new, untimed, call of setup each time.
+    """
+    durations = []
+    for _ in range(repeat):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        result = func(*args)
+        durations.append(time.perf_counter() - start)
+    return {
+        'min': min(durations),
+        'median': statistics.median(durations),
+        'mean': statistics.mean(durations),
+        'max': max(durations),
+    }, result
+
+
+def run(size, engine='fast', fmt='png', repeat=5, directory=None,
+        backend='matplotlib'):
+    """Returns the timings of the stages of the rendering of a diagram
+    generated with size, a dict of the arguments of generate.
+    """
+    from dooble.render import new_figure, render_to_file
+
+    text = generate(**size)
+    idl = Idl(engine=engine)
+    stages = {}
+
+    stages['parse'], ast = measure(lambda: idl.parse(text), repeat)
+    stages['create_marble_from_ast'], marble = measure(
+        lambda: create_marble_from_ast(ast, build=False), repeat)
+
+    def build(marble):
+        marble.build()
+        return marble
+
+    # builds are incremental: each run builds a new marble
+    stages['build'], marble = measure(
+        build, repeat, setup=lambda: create_marble_from_ast(ast, build=False))
+
+    fig = new_figure()
+    filename = os.path.join(directory, 'marble.' + fmt)
+    stages['render_to_file'], _ = measure(
+        lambda: render_to_file(
+            marble, filename, default_theme, fig=fig, backend=backend),
+        repeat)
+
+    return {
+        'size': size,
+        'text_length': len(text),
+        'layers': len(marble.layers),
+        'items': sum(
+            len(layer.items) for layer in marble.layers
+            if type(layer) is Observable),
+        'stages': stages,
+    }
+
+
+def environment():
+    import matplotlib
+    try:
+        import PIL
+        pillow = PIL.__version__
+    except ImportError:
+        pillow = None
+    return {
+        'dooble': dooble.__version__,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'matplotlib': matplotlib.__version__,
+        'pillow': pillow,
+    }
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(
+        description='time the parsing, model creation and rendering of '
+                    'synthetic diagrams')
+    parser.add_argument(
+        '--items',
+        help='numbers of items per layer, one benchmark per value '
+             '(default: 10 100 1000)',
+        type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument(
+        '--sections',
+        help='number of operator sections (default: 2)',
+        type=int, default=2)
+    parser.add_argument(
+        '--layers',
+        help='number of input observables per section (default: 2)',
+        type=int, default=2)
+    parser.add_argument(
+        '--childs',
+        help='number of child observables per section (default: 2)',
+        type=int, default=2)
+    parser.add_argument(
+        '--engine',
+        help='parser engine (default: fast)',
+        choices=engines, default='fast')
+    parser.add_argument(
+        '--format',
+        help='format of the rendered diagrams (default: png)',
+        default='png')
+    parser.add_argument(
+        '--backend',
+        help='backend of the raster formats (default: matplotlib)',
+        choices=backends, default='matplotlib')
+    parser.add_argument(
+        '--repeat',
+        help='number of runs of each stage (default: 5)',
+        type=int, default=5)
+    parser.add_argument(
+        '--output',
+        help='file where results are saved (default: standard output)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    import matplotlib
+    matplotlib.use('Agg')
+
+    directory = tempfile.mkdtemp()
+    try:
+        results = []
+        for items in args.items:
+            size = {
+                'sections': args.sections,
+                'layers': args.layers,
+                'items': items,
+                'childs': args.childs,
+            }
+            results.append(run(
+                size, engine=args.engine, fmt=args.format,
+                repeat=args.repeat, directory=directory,
+                backend=args.backend))
+    finally:
+        shutil.rmtree(directory)
+
+    report = {
+        'environment': environment(),
+        'engine': args.engine,
+        'format': args.format,
+        'backend': args.backend,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+            output.write('\n')
+
+
+if __name__ == '__main__':
+    main()
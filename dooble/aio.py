@@ -0,0 +1,137 @@
+"""Asyncio interface of the parsing and rendering of marble diagrams.
+
+Parsing and rendering run in an executor, the default one of the event
+loop unless another one is provided, such as a ProcessPoolExecutor. At most
+max_concurrency of them run at the same time, the others waiting without
+being submitted to the executor: cancelling them, or their timeout
+expiring, ensures that they never run. Once submitted, a call keeps its
+place until the executor is done with it, even if it was cancelled.
+"""
+import asyncio
+import threading
+from functools import partial
+from dooble.batch import create_marble
+from dooble.dooble import default_theme
+from dooble.idl import Idl
+
+# parsers and figures are not thread safe: each thread of the executor, or
+# each process, has its own ones
+_local = threading.local()
+
+
+def _parse(text):
+    if not hasattr(_local, 'idl'):
+        _local.idl = Idl(engine='fast')
+    return create_marble(_local.idl, text)
+
+
+def _render(marble, theme, fmt, dpi):
+    from dooble.render import new_figure, render_to_bytes
+    if fmt == 'svg':
+        return render_to_bytes(marble, theme, fmt=fmt, dpi=dpi)
+    if not hasattr(_local, 'fig'):
+        _local.fig = new_figure()
+    return render_to_bytes(marble, theme, fmt=fmt, dpi=dpi, fig=_local.fig)
+
+
+class Renderer(object):
+    """Parses and renders diagrams in executor, max_concurrency at a time
+    (unlimited by default).
+
+    Operations taking more than timeout seconds, waiting time included, are
+    cancelled with asyncio.TimeoutError. timeout can be overridden on each
+    call.
+    """
+
+    def __init__(self, executor=None, max_concurrency=None, timeout=None,
+                 theme=default_theme):
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.theme = theme
+        self.semaphore = None
+        self.loop = None
+
+    async def run(self, func, *args, timeout=None):
+        """Returns the result of func(*args), called in the executor."""
+        if timeout is None:
+            timeout = self.timeout
+        return await asyncio.wait_for(self._run(func, *args), timeout)
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_event_loop()
+        if self.max_concurrency is None:
+            return await loop.run_in_executor(self.executor, func, *args)
+
+        # created here, so that it belongs to the running event loop
+        if self.semaphore is None or self.loop is not loop:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+            self.loop = loop
+        semaphore = self.semaphore
+        await semaphore.acquire()
+        try:
+            future = loop.run_in_executor(self.executor, func, *args)
+        except BaseException:
+            semaphore.release()
+            raise
+        # the executor cannot be interrupted: the call is shielded from
+        # cancellation, and releases the semaphore once it is really done
+        future.add_done_callback(lambda _: semaphore.release())
+        return await asyncio.shield(future)
+
+    async def parse(self, text, timeout=None):
+        """Returns the built marble defined in text."""
+        return await self.run(_parse, text, timeout=timeout)
+
+    async def render(self, marble, fmt='png', dpi=100, timeout=None):
+        """Returns the fmt rendering of marble."""
+        return await self.run(
+            _render, marble, self.theme, fmt, dpi, timeout=timeout)
+
+    async def render_text(self, text, fmt='png', dpi=100, timeout=None):
+        """Returns the fmt rendering of the marble defined in text. timeout
+        applies to the parsing and the rendering together.
+        """
+        if timeout is None:
+            timeout = self.timeout
+
+        async def parse_and_render():
+            marble = await self._run(_parse, text)
+            return await self._run(_render, marble, self.theme, fmt, dpi)
+        return await asyncio.wait_for(parse_and_render(), timeout)
+
+    async def render_many(self, marbles, fmt='png', dpi=100, timeout=None,
+                          return_exceptions=False):
+        """Returns the fmt renderings of marbles, rendered concurrently."""
+        render = partial(self.render, fmt=fmt, dpi=dpi, timeout=timeout)
+        return await asyncio.gather(
+            *[render(marble) for marble in marbles],
+            return_exceptions=return_exceptions)
+
+
+_default_renderer = Renderer()
+
+
+async def parse(text, timeout=None):
+    """Returns the built marble defined in text, parsed in the default
+    executor of the event loop.
+    """
+    return await _default_renderer.parse(text, timeout=timeout)
+
+
+async def render(marble, fmt='png', dpi=100, timeout=None):
+    """Returns the fmt rendering of marble, rendered in the default executor
+    of the event loop.
+    """
+    return await _default_renderer.render(
+        marble, fmt=fmt, dpi=dpi, timeout=timeout)
+
+
+async def render_many(marbles, fmt='png', dpi=100, timeout=None,
+                      return_exceptions=False):
+    """Returns the fmt renderings of marbles, rendered concurrently in the
+    default executor of the event loop.
+    """
+    return await _default_renderer.render_many(
+        marbles, fmt=fmt, dpi=dpi, timeout=timeout,
+        return_exceptions=return_exceptions)
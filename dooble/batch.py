@@ -0,0 +1,177 @@
+import os
+from collections import namedtuple
+from dooble.idl import Idl
+from dooble.dooble import create_marble_from_ast
+from dooble.cache import cache_key
+from dooble.profiling import Profiler, null_profiler
+
+Result = namedtuple(
+    'Result', ['input', 'output', 'error', 'cached', 'timings'])
+
+
+def load_marble(idl, filename, profiler=None):
+    with open(filename, 'r') as idl_file:
+        idl_text = idl_file.read()
+
+    return create_marble(idl, idl_text, profiler)
+
+
+def output_file(input_file, output_dir, fmt):
+    name = os.path.splitext(os.path.basename(input_file))[0]
+    return os.path.join(output_dir, '{}.{}'.format(name, fmt))
+
+
+def create_marble(idl, text, profiler=None):
+    """Returns the built marble defined in text, each stage being timed by
+    profiler.
+    """
+    profiler = profiler or null_profiler
+    with profiler.stage('Idl.parse'):
+        ast = idl.parse(text)
+    with profiler.stage('create_marble_from_ast'):
+        marble = create_marble_from_ast(ast, build=False)
+    with profiler.stage('Marble.build'):
+        marble.build()
+    return marble
+
+
+def render_text(idl, text, filename, theme, cache=None, fig=None,
+                profiler=None, backend='matplotlib'):
+    """Renders the marble defined in text to filename, with backend (see
+    dooble.render.render_to_file).
+
+    When a cache is provided, the diagram is taken from it if it was already
+    rendered, without parsing text. Returns True in this case. The stages of
+    the rendering are timed by profiler, a dooble.profiling.Profiler.
+    """
+    from dooble.render import dpi, output_format, render_to_file
+    profiler = profiler or null_profiler
+    fmt = output_format(filename)
+    if cache is not None:
+        key = cache_key(text, theme, fmt, dpi, backend)
+        if cache.fetch(key, fmt, filename):
+            return True
+
+    marble = create_marble(idl, text, profiler)
+    with profiler.stage('render_to_file'):
+        render_to_file(marble, filename, theme, fig=fig, backend=backend)
+    if cache is not None:
+        cache.store(key, fmt, filename)
+    return False
+
+
+def describe_error(error):
+    return '{}: {}'.format(type(error).__name__, error)
+
+
+class Worker(object):
+    """Renders marble files, reusing the same parser and figure."""
+
+    def __init__(self, cache=None, profiler=None, backend='matplotlib'):
+        self.idl = Idl(engine='fast')
+        self.cache = cache
+        self.profiler = profiler
+        self.backend = backend
+        self.fig = None
+
+    def figure(self, filename):
+        from dooble.render import new_figure, output_format
+        if output_format(filename) == 'svg' or self.backend != 'matplotlib':
+            return None
+        if self.fig is None:
+            self.fig = new_figure()
+        return self.fig
+
+    def timings_since(self, first):
+        if self.profiler is None:
+            return None
+        return self.profiler.timings[first:]
+
+    def render(self, name, text, output_file, theme):
+        """Renders text, the definition of the diagram name, to output_file.
+
+        Errors are reported in the returned Result instead of being raised.
+        """
+        first = len(self.profiler.timings) if self.profiler else 0
+        try:
+            cached = render_text(
+                self.idl, text, output_file, theme,
+                cache=self.cache, fig=self.figure(output_file),
+                profiler=self.profiler, backend=self.backend)
+        except Exception as e:
+            return Result(
+                name, output_file, describe_error(e), False,
+                self.timings_since(first))
+        return Result(
+            name, output_file, None, cached, self.timings_since(first))
+
+    def __call__(self, task):
+        input_file, output_file, theme = task
+        try:
+            with open(input_file, 'r') as idl_file:
+                text = idl_file.read()
+        except OSError as e:
+            return Result(
+                input_file, output_file, describe_error(e), False,
+                [] if self.profiler else None)
+        return self.render(input_file, text, output_file, theme)
+
+
+_worker = None
+
+
+def _init_worker(cache, memory, backend):
+    global _worker
+    if backend == 'matplotlib':
+        import matplotlib
+        matplotlib.use('Agg')
+    # timings are recorded in each process, and sent back with the results
+    profiler = None if memory is None else Profiler(memory=memory)
+    _worker = Worker(cache, profiler, backend)
+
+
+def _run_worker(task):
+    return _worker(task)
+
+
+def render_files(inputs, outputs, theme, jobs=1, cache=None,
+                 profiler=None, backend='matplotlib'):
+    """Renders each input marble file to the corresponding output file.
+
+    With jobs greater than 1, the files are shared between a pool of jobs
+    worker processes. 0 uses one process per CPU. A Result is yielded for
+    each file as soon as it is rendered, so results are not ordered when
+    several jobs are used. Errors are reported in Result.error instead of
+    being raised, so that one invalid file does not abort the whole batch.
+    Diagrams found in cache, a RenderCache, are not parsed nor rendered.
+    The stages of the rendering are timed by profiler: when several jobs are
+    used, they are timed in the worker processes and recorded in profiler as
+    results are received, but are not profiled with cProfile. Raster
+    formats are drawn by backend, see dooble.render.render_to_file.
+    """
+    tasks = [(i, o, theme) for i, o in zip(inputs, outputs)]
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(tasks))
+
+    if jobs <= 1:
+        worker = Worker(cache, profiler, backend)
+        for task in tasks:
+            yield worker(task)
+        return
+
+    import multiprocessing
+    chunksize = max(1, len(tasks) // (jobs * 4))
+    memory = None if profiler is None else profiler.memory
+    pool = multiprocessing.Pool(
+        jobs, initializer=_init_worker, initargs=(cache, memory, backend))
+    try:
+        for result in pool.imap_unordered(_run_worker, tasks, chunksize):
+            if profiler is not None:
+                for timing in result.timings:
+                    profiler.record(timing)
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,106 @@
+import hashlib
+import os
+import shutil
+import threading
+import dooble
+
+default_max_size = 256 * 1024 * 1024
+
+
+def cache_key(text, theme, fmt, dpi, backend='matplotlib'):
+    """Returns the key of the diagram rendered from text, with theme, in the
+    fmt output format and at dpi resolution by backend, with this version of
+    dooble.
+    """
+    digest = hashlib.sha256()
+    for part in [dooble.__version__, fmt, dpi, backend, tuple(theme), text]:
+        digest.update(repr(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class RenderCache(object):
+    """On-disk cache of rendered diagrams, addressed by content.
+
+    Entries are evicted in least recently used order once the total size of
+    the cache exceeds max_size bytes. With link set, cached diagrams are hard
+    linked to their destination instead of copied, when the file system
+    allows it. Entries are read-only, so that writing to a linked
+    destination fails instead of altering the cache: destinations must then
+    only be written by replacing them.
+    """
+
+    def __init__(self, directory, max_size=default_max_size, link=False):
+        self.directory = directory
+        self.max_size = max_size
+        self.link = link
+        self.size = None
+
+    def path(self, key, fmt):
+        return os.path.join(self.directory, key[:2], '{}.{}'.format(key, fmt))
+
+    def fetch(self, key, fmt, filename):
+        """Writes the cached diagram of key to filename.
+
+        Returns False if the diagram is not in the cache. In this case, a
+        previous hard link to a cached diagram at filename is removed, so
+        that rendering to filename cannot alter the cache.
+        """
+        path = self.path(key, fmt)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            if os.path.exists(filename) and os.stat(filename).st_nlink > 1:
+                os.remove(filename)
+            return False
+
+        if os.path.exists(filename):
+            if os.path.samefile(path, filename):
+                return True
+            os.remove(filename)
+        if self.link:
+            try:
+                os.link(path, filename)
+                return True
+            except OSError:
+                pass
+        shutil.copyfile(path, filename)
+        return True
+
+    def store(self, key, fmt, filename):
+        path = self.path(key, fmt)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = '{}.{}-{}.tmp'.format(
+            path, os.getpid(), threading.get_ident())
+        shutil.copyfile(filename, tmp_path)
+        os.chmod(tmp_path, 0o444)
+        os.replace(tmp_path, path)
+
+        if self.size is None:
+            self.size = sum(size for _, size, _ in self.entries())
+        else:
+            self.size += os.path.getsize(path)
+        if self.size > self.max_size:
+            self.evict()
+
+    def entries(self):
+        for dirpath, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def evict(self):
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        self.size = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if self.size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.size -= size
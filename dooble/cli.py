@@ -1,32 +1,310 @@
 import argparse
+import glob
+import os
+import sys
 from dooble.idl import Idl
-from dooble.dooble import create_marble_from_ast, default_theme
-from dooble.render import render_to_file
+from dooble.dooble import default_theme
+from dooble.batch import create_marble, output_file, render_files, \
+    render_text
+from dooble.cache import RenderCache
+from dooble.sections import is_template, read_sections, render_sections
+from dooble.profiling import Profiler, format_summary, null_profiler
 
 
-def parse_arguments():
-    parser = argparse.ArgumentParser()
+def add_cache_arguments(parser):
+    parser.add_argument(
+        '--cache-dir',
+        help='directory where rendered diagrams are cached, so that they are '
+             'rendered again only when their definition changes '
+             '(default: $DOOBLE_CACHE_DIR, no cache if not set)',
+        default=os.environ.get('DOOBLE_CACHE_DIR'))
+    parser.add_argument(
+        '--cache-link',
+        help='hard link cached diagrams to their destination instead of '
+             'copying them. Linked diagrams are read-only, and must not be '
+             'written to without the cache',
+        action='store_true')
+    parser.add_argument(
+        '--cache-size',
+        help='maximum size of the cache, in MiB (default: 256)',
+        type=int,
+        default=256)
+
+
+def create_cache(args):
+    if args.cache_dir is None:
+        return None
+    return RenderCache(
+        args.cache_dir, max_size=args.cache_size * 1024 * 1024,
+        link=args.cache_link)
+
+
+def add_timings_arguments(parser):
+    parser.add_argument(
+        '--timings',
+        help='print the time spent in each stage of the rendering: parsing, '
+             'creation of the marble, computation of its links and drawing',
+        action='store_true')
+    parser.add_argument(
+        '--timings-json',
+        help='file where the timings of each stage are saved as JSON',
+        metavar='FILE')
+    parser.add_argument(
+        '--memory',
+        help='also trace the peak memory of each stage, which slows them '
+             'down',
+        action='store_true')
+    parser.add_argument(
+        '--profile',
+        help='directory where the cProfile statistics of each stage are '
+             'saved (implies --jobs 1)',
+        metavar='DIR')
+
+
+def create_profiler(args):
+    if not (args.timings or args.timings_json or args.memory
+            or args.profile):
+        return None
+    return Profiler(memory=args.memory, profile=args.profile is not None)
+
+
+def report_timings(profiler, args):
+    if args.timings or args.memory:
+        print(format_summary(profiler.summary()), file=sys.stderr)
+    if args.timings_json is not None:
+        import json
+        with open(args.timings_json, 'w') as json_file:
+            json.dump(profiler.to_json(), json_file, indent=2)
+    if args.profile is not None:
+        profiler.dump_profiles(args.profile)
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(
+        epilog='use "dooble watch --help" for the watch mode, and '
+               '"dooble serve --help" for the rendering service')
 
     parser.add_argument(
         '--input',
-        help='marble diagram definition file',
+        help='marble diagram definition file (- for the standard input), '
+             'or directory or glob pattern of definition files to render in '
+             'batch',
         required=True)
     parser.add_argument(
         '--output',
-        help='file where rendered diagram will be saved',
+        help='file where rendered diagram will be saved, or directory '
+             'where rendered diagrams are saved in batch. A path containing '
+             '{name} or {index} reads the input as sections of several '
+             'diagrams, each one saved to this path',
         required=True)
-    return parser.parse_args()
+    parser.add_argument(
+        '--format',
+        help='format of the diagrams rendered in batch (default: png)',
+        default='png')
+    parser.add_argument(
+        '--jobs',
+        help='number of processes rendering diagrams in batch, 0 uses all '
+             'CPUs (default: 1)',
+        type=int,
+        default=1)
+    parser.add_argument(
+        '--backend',
+        help='renderer of raster formats: matplotlib, or raster which draws '
+             'with Pillow, faster and without matplotlib (default: '
+             'matplotlib)',
+        choices=['matplotlib', 'raster'],
+        default='matplotlib')
+    parser.add_argument(
+        '--tile-width',
+        help='split the time axis of the diagram in tiles of this width, '
+             'rendered to numbered files, or to the pages of a PDF file',
+        type=float)
+    add_cache_arguments(parser)
+    add_timings_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.tile_width is not None:
+        if args.tile_width <= 0:
+            parser.error('--tile-width must be positive')
+        if is_batch(args.input) or is_template(args.output):
+            parser.error('--tile-width renders a single diagram')
+        if args.backend != 'matplotlib':
+            parser.error('--tile-width renders with matplotlib')
+    return args
+
+
+def parse_watch_arguments(argv):
+    parser = argparse.ArgumentParser(
+        prog='dooble watch',
+        description='render the marble diagram definition files of a '
+                    'directory each time they change')
+
+    parser.add_argument(
+        'directory',
+        help='directory of the marble diagram definition files')
+    parser.add_argument(
+        '--output',
+        help='directory where rendered diagrams are saved (default: the '
+             'watched directory)')
+    parser.add_argument(
+        '--format',
+        help='format of the rendered diagrams (default: png)',
+        default='png')
+    parser.add_argument(
+        '--interval',
+        help='polling interval, in seconds (default: 0.5)',
+        type=float,
+        default=0.5)
+    parser.add_argument(
+        '--debounce',
+        help='delay without changes before a file is rendered, in seconds '
+             '(default: 0.2)',
+        type=float,
+        default=0.2)
+    add_cache_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def parse_serve_arguments(argv):
+    parser = argparse.ArgumentParser(
+        prog='dooble serve',
+        description='render the marble diagram definitions posted to '
+                    '/render over HTTP')
+
+    parser.add_argument(
+        '--host',
+        help='address to listen on (default: 127.0.0.1)',
+        default='127.0.0.1')
+    parser.add_argument(
+        '--port',
+        help='port to listen on (default: 8000)',
+        type=int,
+        default=8000)
+    parser.add_argument(
+        '--socket',
+        help='Unix socket to listen on, instead of a TCP port')
+    parser.add_argument(
+        '--workers',
+        help='number of rendering processes (default: one per CPU)',
+        type=int)
+    parser.add_argument(
+        '--queue-size',
+        help='number of requests waiting for a worker before new ones are '
+             'rejected (default: 16)',
+        type=int,
+        default=16)
+    parser.add_argument(
+        '--timeout',
+        help='maximum duration of a rendering, in seconds (default: 30)',
+        type=float,
+        default=30.0)
+    return parser.parse_args(argv)
+
+
+def serve_main(argv):
+    from dooble.serve import serve
+    args = parse_serve_arguments(argv)
+    try:
+        serve(
+            host=args.host, port=args.port, socket_path=args.socket,
+            workers=args.workers, queue_size=args.queue_size,
+            timeout=args.timeout)
+    except KeyboardInterrupt:
+        pass
+
+
+def watch_main(argv):
+    from dooble.watch import watch
+    args = parse_watch_arguments(argv)
+    try:
+        watch(
+            args.directory, args.output or args.directory, args.format,
+            default_theme, interval=args.interval, debounce=args.debounce,
+            cache=create_cache(args))
+    except KeyboardInterrupt:
+        pass
+
+
+def is_batch(path):
+    return os.path.isdir(path) or glob.escape(path) != path
+
+
+def read_input(path):
+    if path == '-':
+        return sys.stdin.read()
+    with open(path, 'r') as idl_file:
+        return idl_file.read()
+
+
+def input_lines(path):
+    """Yields the lines of path, read as they are consumed."""
+    if path == '-':
+        yield from sys.stdin
+        return
+    with open(path, 'r') as idl_file:
+        yield from idl_file
+
+
+def report_failures(results):
+    """Prints the errors of results, and returns their number."""
+    count = 0
+    failures = 0
+    for result in results:
+        count += 1
+        if result.error is not None:
+            failures += 1
+            print('{}: {}'.format(result.input, result.error),
+                  file=sys.stderr)
+    if failures > 0:
+        print('{} of {} diagrams failed'.format(failures, count),
+              file=sys.stderr)
+    return failures
+
+
+def input_files(path):
+    if os.path.isdir(path):
+        path = os.path.join(path, '*.txt')
+    return sorted(glob.glob(path))
 
 
 def main():
-    args = parse_arguments()
+    argv = sys.argv[1:]
+    if len(argv) > 0 and argv[0] == 'watch':
+        return watch_main(argv[1:])
+    if len(argv) > 0 and argv[0] == 'serve':
+        return serve_main(argv[1:])
 
-    idl_file = open(args.input, 'r')
-    idl_text = idl_file.read()
+    args = parse_arguments(argv)
+    cache = create_cache(args)
+    profiler = create_profiler(args)
+    status = None
 
-    idl = Idl()
-    ast = idl.parse(idl_text)
+    if is_batch(args.input):
+        inputs = input_files(args.input)
+        os.makedirs(args.output, exist_ok=True)
+        outputs = [output_file(i, args.output, args.format) for i in inputs]
+        jobs = 1 if args.profile is not None else args.jobs
+        if report_failures(render_files(
+                inputs, outputs, default_theme, jobs=jobs, cache=cache,
+                profiler=profiler, backend=args.backend)) > 0:
+            status = 1
+    elif is_template(args.output):
+        if report_failures(render_sections(
+                read_sections(input_lines(args.input)), args.output,
+                default_theme, cache=cache, profiler=profiler,
+                backend=args.backend)) > 0:
+            status = 1
+    elif args.tile_width is not None:
+        from dooble.tiles import render_tiles
+        marble = create_marble(
+            Idl(engine='fast'), read_input(args.input), profiler)
+        with (profiler or null_profiler).stage('render_to_file'):
+            render_tiles(marble, args.output, default_theme, args.tile_width)
+    else:
+        render_text(
+            Idl(engine='fast'), read_input(args.input), args.output,
+            default_theme, cache=cache, profiler=profiler,
+            backend=args.backend)
 
-    #print(ast)
-    marble = create_marble_from_ast(ast)
-    render_to_file(marble, args.output, default_theme)
+    if profiler is not None:
+        report_timings(profiler, args)
+    return status
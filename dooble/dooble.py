@@ -103,7 +103,10 @@ def create_operator(layer):
     return operator
 
 
-def create_marble_from_ast(ast):
+def create_marble_from_ast(ast, build=True):
+    """Returns the marble of ast. The links of the marble are computed only
+    with build set, otherwise Marble.build must be called before rendering.
+    """
     marble = Marble()
 
     for layer in ast:
@@ -112,5 +115,6 @@ def create_marble_from_ast(ast):
         elif 'op' in layer and layer['op'] is not None:
             marble.add_operator(create_operator(layer['op']))
 
-    marble.build()
+    if build:
+        marble.build()
     return marble
@@ -1,4 +1,5 @@
-import tatsu
+import threading
+from dooble.idl_fast import FastParser
 
 grammar = '''
     @@grammar::dooble
@@ -35,10 +36,54 @@ grammar = '''
     description = /[a-zA-Z0-9,:+*() <>_]+/ ;
 '''
 
+engines = ['tatsu', 'generated', 'fast']
 
-class Idl(object):
+_model = None
+_model_lock = threading.Lock()
+
+
+def compiled_model():
+    """Returns the TatSu model of the grammar, compiled once per process."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            import tatsu
+            _model = tatsu.compile(grammar)
+    return _model
+
+
+def generate_parser(filename):
+    """Writes the TatSu generated parser of the grammar to filename.
+
+    The package ships such a module as dooble.idl_parser. It must be
+    regenerated (make parser) each time the grammar is updated.
+    """
+    import tatsu
+    source = tatsu.to_python_sourcecode(grammar)
+    with open(filename, 'w') as parser_file:
+        parser_file.write(source)
+
+
+class GeneratedModel(object):
     def __init__(self):
-        self.model = tatsu.compile(grammar)
+        from dooble.idl_parser import doobleParser
+        self.parser = doobleParser(parseinfo=False)
+
+    def parse(self, text, whitespace=None):
+        return self.parser.parse(
+            text, rule_name='start', whitespace=whitespace)
+
+
+class Idl(object):
+    def __init__(self, engine='tatsu'):
+        if engine == 'tatsu':
+            self.model = compiled_model()
+        elif engine == 'generated':
+            self.model = GeneratedModel()
+        elif engine == 'fast':
+            self.model = FastParser()
+        else:
+            raise ValueError('unknown idl engine: {}'.format(engine))
 
     def parse(self, text):
         ast = self.model.parse(text, whitespace='\n')
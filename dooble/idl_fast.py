@@ -0,0 +1,114 @@
+import re
+
+_item_re = re.compile('[a-zA-Z0-9+.,]+')
+_description_re = re.compile('[a-zA-Z0-9,:+*() <>_]+')
+_labels = frozenset('abcdefghijklmnopqrstuvwxyz')
+_completions = frozenset('>|*')
+
+
+class ParseError(Exception):
+    def __init__(self, text, pos, expected):
+        line = text.count('\n', 0, pos) + 1
+        col = pos - (text.rfind('\n', 0, pos) + 1) + 1
+        super(ParseError, self).__init__(
+            'expecting {} at line {}, column {}'.format(expected, line, col))
+        self.pos = pos
+        self.line = line
+        self.col = col
+
+
+class FastParser(object):
+    """Single pass parser of the dooble grammar.
+
+    It accepts the same language as the TatSu grammar defined in dooble.idl
+    and returns the same AST, without backtracking: each character of the
+    input is read once. The state of each parsing is kept in a _Scanner, so
+    that a parser can be shared between threads.
+    """
+
+    def parse(self, text, whitespace=None):
+        return _Scanner(text, whitespace).parse()
+
+
+class _Scanner(object):
+    """State of the parsing of text by FastParser."""
+
+    def __init__(self, text, whitespace=None):
+        self.text = text
+        self.length = len(text)
+        self.whitespace = frozenset(whitespace or '')
+
+    def parse(self):
+        text = self.text
+        ast = []
+        pos = 0
+        while True:
+            start = self._skip(pos)
+            if start == self.length:
+                return ast
+            if text[start] == '[':
+                op, pos = self._operator(start)
+                ast.append({'obs': None, 'op': op})
+            else:
+                obs, pos = self._observable(pos)
+                ast.append({'obs': obs, 'op': None})
+
+    def _skip(self, pos):
+        text = self.text
+        while pos < self.length and text[pos] in self.whitespace:
+            pos += 1
+        return pos
+
+    def _peek(self, pos):
+        pos = self._skip(pos)
+        if pos < self.length:
+            return pos, self.text[pos]
+        return pos, None
+
+    def _observable(self, pos):
+        skipspans = []
+        while True:
+            next_pos, c = self._peek(pos)
+            if c != ' ':
+                break
+            skipspans.append(c)
+            pos = next_pos + 1
+
+        obs = [skipspans]
+        next_pos, c = self._peek(pos)
+        if c == '+' or c in _labels:
+            obs.append(c)
+            pos = next_pos + 1
+
+        lifetimes = []
+        while True:
+            next_pos, c = self._peek(pos)
+            if c == '-':
+                lifetimes.append({'ts': c, 'item': None})
+                pos = next_pos + 1
+                continue
+            match = _item_re.match(self.text, next_pos)
+            if match is None:
+                break
+            lifetimes.append({'ts': None, 'item': match.group()})
+            pos = match.end()
+        obs.append(lifetimes)
+
+        next_pos, c = self._peek(pos)
+        if c not in _completions:
+            raise ParseError(self.text, next_pos, "one of '>', '|', '*'")
+        obs.append(c)
+        return obs, next_pos + 1
+
+    def _operator(self, pos):
+        pos += 1
+        next_pos = self._skip(pos)
+        match = _description_re.match(self.text, next_pos)
+        if match is None:
+            raise ParseError(self.text, next_pos, 'an operator description')
+        description = match.group()
+
+        next_pos, c = self._peek(match.end())
+        if c != ']':
+            raise ParseError(self.text, next_pos, "']'")
+        return ['[', description, ']'], next_pos + 1
@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# CAVEAT UTILITOR
+#
+# This file was automatically generated by TatSu.
+#
+#    https://pypi.python.org/pypi/tatsu/
+#
+# Any changes you make to it will be overwritten the next time
+# the file is generated.
+
+
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import sys
+
+from tatsu.buffering import Buffer
+from tatsu.parsing import Parser
+from tatsu.parsing import tatsumasu
+from tatsu.util import re, generic_main  # noqa
+
+
+KEYWORDS = {}  # type: ignore
+
+
+class doobleBuffer(Buffer):
+    def __init__(
+        self,
+        text,
+        whitespace=None,
+        nameguard=None,
+        comments_re=None,
+        eol_comments_re=None,
+        ignorecase=None,
+        namechars='',
+        **kwargs
+    ):
+        super(doobleBuffer, self).__init__(
+            text,
+            whitespace=whitespace,
+            nameguard=nameguard,
+            comments_re=comments_re,
+            eol_comments_re=eol_comments_re,
+            ignorecase=ignorecase,
+            namechars=namechars,
+            **kwargs
+        )
+
+
+class doobleParser(Parser):
+    def __init__(
+        self,
+        whitespace=None,
+        nameguard=None,
+        comments_re=None,
+        eol_comments_re=None,
+        ignorecase=None,
+        left_recursion=True,
+        parseinfo=True,
+        keywords=None,
+        namechars='',
+        buffer_class=doobleBuffer,
+        **kwargs
+    ):
+        if keywords is None:
+            keywords = KEYWORDS
+        super(doobleParser, self).__init__(
+            whitespace=whitespace,
+            nameguard=nameguard,
+            comments_re=comments_re,
+            eol_comments_re=eol_comments_re,
+            ignorecase=ignorecase,
+            left_recursion=left_recursion,
+            parseinfo=parseinfo,
+            keywords=keywords,
+            namechars=namechars,
+            buffer_class=buffer_class,
+            **kwargs
+        )
+
+    @tatsumasu()
+    def _start_(self):  # noqa
+
+        def block0():
+            self._layer_()
+        self._closure(block0)
+        self._check_eof()
+
+    @tatsumasu()
+    def _layer_(self):  # noqa
+        with self._choice():
+            with self._option():
+                self._observable_()
+                self.name_last_node('obs')
+            with self._option():
+                self._operator_()
+                self.name_last_node('op')
+            self._error('no available options')
+        self.ast._define(
+            ['obs', 'op'],
+            []
+        )
+
+    @tatsumasu()
+    def _observable_(self):  # noqa
+
+        def block0():
+            self._skipspan_()
+        self._closure(block0)
+        with self._optional():
+            self._prefix_()
+
+        def block1():
+            self._lifetime_()
+        self._closure(block1)
+        self._completion_()
+
+    @tatsumasu()
+    def _operator_(self):  # noqa
+        self._token('[')
+        self._description_()
+        self._token(']')
+
+    @tatsumasu()
+    def _prefix_(self):  # noqa
+        with self._choice():
+            with self._option():
+                self._token('+')
+            with self._option():
+                self._label_()
+            self._error('no available options')
+
+    @tatsumasu()
+    def _label_(self):  # noqa
+        self._pattern('[a-z]')
+
+    @tatsumasu()
+    def _lifetime_(self):  # noqa
+        with self._choice():
+            with self._option():
+                self._timespan_()
+                self.name_last_node('ts')
+            with self._option():
+                self._item_()
+                self.name_last_node('item')
+            self._error('no available options')
+        self.ast._define(
+            ['item', 'ts'],
+            []
+        )
+
+    @tatsumasu()
+    def _completion_(self):  # noqa
+        self._pattern('[>|\\*]')
+
+    @tatsumasu()
+    def _skipspan_(self):  # noqa
+        self._token(' ')
+
+    @tatsumasu()
+    def _timespan_(self):  # noqa
+        self._token('-')
+
+    @tatsumasu()
+    def _item_(self):  # noqa
+        self._pattern('[a-zA-Z0-9+.,]+')
+
+    @tatsumasu()
+    def _description_(self):  # noqa
+        self._pattern('[a-zA-Z0-9,:+*() <>_]+')
+
+
+class doobleSemantics(object):
+    def start(self, ast):  # noqa
+        return ast
+
+    def layer(self, ast):  # noqa
+        return ast
+
+    def observable(self, ast):  # noqa
+        return ast
+
+    def operator(self, ast):  # noqa
+        return ast
+
+    def prefix(self, ast):  # noqa
+        return ast
+
+    def label(self, ast):  # noqa
+        return ast
+
+    def lifetime(self, ast):  # noqa
+        return ast
+
+    def completion(self, ast):  # noqa
+        return ast
+
+    def skipspan(self, ast):  # noqa
+        return ast
+
+    def timespan(self, ast):  # noqa
+        return ast
+
+    def item(self, ast):  # noqa
+        return ast
+
+    def description(self, ast):  # noqa
+        return ast
+
+
+def main(filename, start=None, **kwargs):
+    if start is None:
+        start = 'start'
+    if not filename or filename == '-':
+        text = sys.stdin.read()
+    else:
+        with open(filename) as f:
+            text = f.read()
+    parser = doobleParser()
+    return parser.parse(text, rule_name=start, filename=filename, **kwargs)
+
+
+if __name__ == '__main__':
+    import json
+    from tatsu.util import asjson
+
+    ast = generic_main(main, doobleParser, name='dooble')
+    print('AST:')
+    print(ast)
+    print()
+    print('JSON:')
+    print(json.dumps(asjson(ast), indent=2))
+    print()
@@ -0,0 +1,100 @@
+"""Incremental parsing of marble diagram definitions being edited.
+
+A definition is usually one layer per line. IncrementalParser parses each
+line on its own, and keeps the AST and the observables or operators of each
+line, keyed by its text: after an edit, only the lines that changed are
+parsed again, and the marble reuses the layers and the links of the others.
+
+Layers can also span several lines, or share one: when a line cannot be
+parsed on its own, the whole definition is parsed, so that the AST, and the
+errors, are the ones of Idl.parse.
+"""
+from dooble.dooble import create_observable, create_operator
+from dooble.idl import Idl
+from dooble.marble import Marble, Operator
+
+
+def create_layer(layer):
+    if 'obs' in layer and layer['obs'] is not None:
+        return create_observable(layer['obs'])
+    return create_operator(layer['op'])
+
+
+class IncrementalParser(object):
+    """Parses successive versions of a definition.
+
+    The observables and operators of unchanged lines are shared between the
+    successive marbles: they must not be modified.
+    """
+
+    def __init__(self, idl=None):
+        self.idl = idl or Idl(engine='fast')
+        self.lines = []
+        self.entries = []
+        self.ast = []
+        self.layers = []
+        self.marble = None
+
+    def _entry(self, line, cache):
+        """Returns the (ast, layers) of line, None when it cannot be parsed
+        on its own.
+        """
+        entry = cache.get(line)
+        if entry is None:
+            try:
+                ast = self.idl.parse(line)
+            except Exception:
+                return None
+            entry = ast, [create_layer(layer) for layer in ast]
+        return entry
+
+    def _update(self):
+        ast = []
+        layers = []
+        for entry in self.entries:
+            if entry is None:
+                ast = self.idl.parse('\n'.join(self.lines))
+                layers = [create_layer(layer) for layer in ast]
+                break
+            ast.extend(entry[0])
+            layers.extend(entry[1])
+        self.ast = ast
+        self.layers = layers
+        return ast
+
+    def parse(self, text):
+        """Returns the AST of text, parsing only the lines that are not
+        lines of the previous text.
+        """
+        cache = dict(zip(self.lines, self.entries))
+        self.lines = text.split('\n')
+        self.entries = [self._entry(line, cache) for line in self.lines]
+        return self._update()
+
+    def edit(self, start, end, lines=()):
+        """Replaces the lines start to end (excluded) of the previous text
+        with lines, and returns the AST of the new text.
+        """
+        cache = dict(zip(self.lines[start:end], self.entries[start:end]))
+        lines = list(lines)
+        self.lines[start:end] = lines
+        self.entries[start:end] = [
+            self._entry(line, cache) for line in lines]
+        return self._update()
+
+    def create_marble(self, build=True):
+        """Returns the marble of the last parsed text. Only the links of the
+        sections with changed layers are computed again.
+        """
+        marble = Marble()
+        for layer in self.layers:
+            if type(layer) is Operator:
+                marble.add_operator(layer)
+            else:
+                marble.add_observable(layer)
+        if self.marble is not None:
+            marble.reuse_links(self.marble)
+        if build:
+            marble.build()
+            self.marble = marble
+        return marble
@@ -0,0 +1,110 @@
+"""Marble diagrams of recorded Rx streams.
+
+Event logs are JSON Lines files, with one record per event:
+
+    {"stream": "clicks", "ts": 12.5, "kind": "next", "value": 1}
+
+stream identifies the observable, ts is the time of the event in seconds,
+and kind is one of next, error, completed or child. A child event emits a
+higher order item on stream: value is then the identifier of the child
+stream, which starts at this time.
+"""
+import json
+from collections import namedtuple
+from dooble.marble import Marble, Observable
+
+Event = namedtuple('Event', ['stream', 'ts', 'kind', 'value'])
+
+kinds = ['next', 'error', 'completed', 'child']
+
+
+def read_events(lines):
+    """Yields an Event for each record of lines, read one at a time.
+
+    lines can be a file object, or any iterable of strings.
+    """
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+            event = Event(
+                record['stream'], float(record['ts']), record['kind'],
+                record.get('value'))
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError('invalid event at line {}: {}'.format(
+                line_number, e))
+        if event.kind not in kinds:
+            raise ValueError('invalid event kind at line {}: {}'.format(
+                line_number, event.kind))
+        yield event
+
+
+class MarbleBuilder(object):
+    """Builds a Marble from a sequence of events.
+
+    Each stream is an observable, in the order streams first appear. Times
+    are mapped to x positions: origin maps to 0 (the time of the first event
+    by default), and each second is time_scale units long.
+    """
+
+    def __init__(self, time_scale=1.0, origin=None):
+        self.time_scale = time_scale
+        self.origin = origin
+        self.marble = Marble()
+        self.observables = {}
+        self.end = 0.0
+
+    def x(self, ts):
+        if self.origin is None:
+            self.origin = ts
+        return (ts - self.origin) * self.time_scale
+
+    def observable(self, stream, at, is_child=False):
+        observable = self.observables.get(stream)
+        if observable is None:
+            observable = Observable(at, is_child=is_child)
+            self.observables[stream] = observable
+            self.marble.add_observable(observable)
+        elif is_child:
+            observable.is_child = True
+        return observable
+
+    def add(self, event):
+        at = self.x(event.ts)
+        self.end = max(self.end, at)
+        observable = self.observable(event.stream, at)
+
+        if event.kind == 'next':
+            observable.on_next_at(event.value, at)
+        elif event.kind == 'error':
+            observable.on_error_at(at)
+        elif event.kind == 'completed':
+            observable.on_completed_at(at)
+        elif event.kind == 'child':
+            observable.on_observable_at(at)
+            self.observable(event.value, at, is_child=True)
+
+    def build(self):
+        """Returns the built marble. Streams that did not terminate continue
+        up to the last event.
+        """
+        for observable in self.observables.values():
+            if observable.completed is None and observable.error is None:
+                observable.on_continued_at(self.end)
+        self.marble.build()
+        return self.marble
+
+
+def build_marble(events, time_scale=1.0, origin=None):
+    builder = MarbleBuilder(time_scale=time_scale, origin=origin)
+    for event in events:
+        builder.add(event)
+    return builder.build()
+
+
+def read_marble(lines, time_scale=1.0, origin=None):
+    """Builds a Marble from a JSON Lines event log, streamed from lines."""
+    return build_marble(
+        read_events(lines), time_scale=time_scale, origin=origin)
@@ -0,0 +1,265 @@
+"""Layout of marble diagrams, shared by all the renderers.
+
+create_layout turns a built Marble into the primitives drawn by the
+renderers: lines, markers, boxes and texts, with their coordinates, the
+size of the figure and the limits of the data. y coordinates are flipped, so
+that the first layer is at the top of the figure.
+
+A layout does not depend on the theme, the output format nor the
+resolution: it is computed once, and can then be rendered several times. It
+only holds arrays and lists, so that it is cheap to pickle, and can be
+converted to JSON with to_json.
+"""
+from array import array
+from dooble.marble import Operator, Observable, KIND_ITEM, KIND_AGGREGATE, \
+    vectorize_threshold
+
+# sizes in inches
+figure_width = 6.4
+layer_height = 0.7
+
+# sizes in data units
+arrow_offset = 0.3
+operator_offset = 0.15
+operator_height = 0.35
+aggregate_height = 0.35
+margin = 0.05
+
+END_COMPLETED = '|'
+END_ERROR = 'x'
+END_CONTINUED = '>'
+
+# name and typecode of the arrays of a layout, each one being the flattened
+# coordinates of its primitives
+arrays = [
+    ('higher_order_links', 'd'),  # x1, y1, x2, y2
+    ('emission_links', 'd'),  # x1, y1, x2, y2
+    ('arrows', 'd'),  # x, y of the arrows at the end of emission links
+    ('timelines', 'd'),  # x1, y, x2, y
+    ('timeline_layers', 'i'),
+    ('ends', 'd'),  # x, y of the end marker of each timeline
+    ('items', 'd'),  # x, y
+    ('item_layers', 'i'),
+    ('aggregates', 'd'),  # x, y, width, height of the density bars
+    ('aggregate_layers', 'i'),
+    ('labels', 'd'),  # x, y
+    ('label_layers', 'i'),
+    ('operators', 'd'),  # x, y, width, height
+    ('operator_layers', 'i'),
+]
+
+
+def max_aggregate_count(marble):
+    counts = [0]
+    for layer in marble.layers:
+        if type(layer) is Observable and KIND_AGGREGATE in layer.items.kinds:
+            items = layer.items
+            counts.extend(
+                items.values[index][0]
+                for kind, index in zip(items.kinds, items.indices)
+                if kind == KIND_AGGREGATE)
+    return max(counts)
+
+
+def numpy_view(coordinates):
+    """Returns a NumPy array sharing the memory of coordinates, an array of
+    x, y pairs, or None when NumPy is not installed or there are less than
+    vectorize_threshold pairs.
+    """
+    if len(coordinates) < 2 * vectorize_threshold:
+        return None
+    try:
+        import numpy as np
+    except ImportError:
+        return None
+    return np.frombuffer(coordinates, dtype=float)
+
+
+def flip_y(coordinates, layer_count):
+    """Flips, in place, the y coordinates of coordinates, an array of x, y
+    pairs, so that the first of layer_count layers is at the top.
+    """
+    view = numpy_view(coordinates)
+    if view is None:
+        coordinates[1::2] = array(
+            'd', [layer_count - y - 1 for y in coordinates[1::2]])
+        return
+    ys = view[1::2]
+    ys *= -1
+    ys += layer_count
+    ys -= 1
+
+
+def shift_y(coordinates, offset):
+    """Adds offset, in place, to the y coordinates of coordinates, an array of
+    x, y pairs.
+    """
+    view = numpy_view(coordinates)
+    if view is None:
+        coordinates[1::2] = array('d', [y + offset for y in coordinates[1::2]])
+        return
+    view[1::2] += offset
+
+
+def bar_height(count, max_count):
+    """Returns the height of the density bar of an aggregate of count items,
+    from a quarter of aggregate_height up to aggregate_height for the
+    largest aggregate of the diagram.
+    """
+    return aggregate_height * (0.25 + 0.75 * count / max_count)
+
+
+def expand(low, high):
+    if low == high:
+        low, high = low - 1.0, high + 1.0
+    delta = (high - low) * margin
+    return low - delta, high + delta
+
+
+class Layout(object):
+    """Primitives of a diagram of layer_count layers.
+
+    The arrays named in dooble.layout.arrays hold the coordinates of the
+    lines, markers and boxes, ordered by layer. end_kinds holds the kind of
+    the end marker of each timeline (END_COMPLETED, END_ERROR or
+    END_CONTINUED), and texts the (x, y, text) of each text, centered on
+    (x, y). width and height are the size of the figure, in inches, and
+    x_limits and y_limits the (min, max) limits of the data, with a margin.
+    """
+
+    def __init__(self, layer_count):
+        self.layer_count = layer_count
+        self.width = figure_width
+        self.height = layer_count * layer_height
+        self.x_limits = None
+        self.y_limits = None
+        for name, typecode in arrays:
+            setattr(self, name, array(typecode))
+        self.end_kinds = []
+        self.texts = []
+
+    def as_array(self, name, columns):
+        """Returns the name array as a (N, columns) NumPy array sharing its
+        memory.
+        """
+        import numpy as np
+        return np.frombuffer(
+            getattr(self, name), dtype=getattr(self, name).typecode
+        ).reshape(-1, columns)
+
+    def to_json(self):
+        data = {
+            'layer_count': self.layer_count,
+            'x_limits': list(self.x_limits),
+            'y_limits': list(self.y_limits),
+            'end_kinds': self.end_kinds,
+            'texts': [list(text) for text in self.texts],
+        }
+        for name, _ in arrays:
+            data[name] = getattr(self, name).tolist()
+        return data
+
+    @classmethod
+    def from_json(cls, data):
+        layout = cls(data['layer_count'])
+        layout.x_limits = tuple(data['x_limits'])
+        layout.y_limits = tuple(data['y_limits'])
+        layout.end_kinds = list(data['end_kinds'])
+        layout.texts = [tuple(text) for text in data['texts']]
+        for name, typecode in arrays:
+            setattr(layout, name, array(typecode, data[name]))
+        return layout
+
+
+def create_layout(marble):
+    """Returns the layout of marble, which must be built."""
+    layout = Layout(len(marble.layers))
+    max_count = max_aggregate_count(marble)
+
+    def plt_y(y):
+        return len(marble.layers) - y - 1
+
+    for links, lines in [
+            (marble.higher_order_links, layout.higher_order_links),
+            (marble.emission_links, layout.emission_links)]:
+        lines.extend(links.coordinates)
+        flip_y(lines, len(marble.layers))
+    # an arrow at the end of each emission link
+    emission_links = layout.emission_links
+    layout.arrows = array('d', [0.0]) * (len(emission_links) // 2)
+    layout.arrows[0::2] = emission_links[2::4]
+    layout.arrows[1::2] = emission_links[3::4]
+    shift_y(layout.arrows, arrow_offset)
+
+    xs = list(marble.higher_order_links.coordinates[0::4])
+    xs.extend(marble.higher_order_links.coordinates[2::4])
+    ys = [0.0, len(marble.layers) - 1.0]
+    for layer_index, layer in enumerate(marble.layers):
+        y = plt_y(layer_index)
+        xs.extend([layer.start, layer.end])
+        if type(layer) is Observable:
+            observable = layer
+            layout.timelines.extend(
+                (observable.start, y, observable.end, y))
+            layout.timeline_layers.append(layer_index)
+
+            if observable.completed is not None:
+                kind, end = END_COMPLETED, observable.completed
+            elif observable.error is not None:
+                kind, end = END_ERROR, observable.error
+            else:
+                kind, end = END_CONTINUED, observable.end
+            layout.ends.extend((end, y))
+            layout.end_kinds.append(kind)
+
+            if observable.label is not None:
+                layout.labels.extend((observable.start, y))
+                layout.label_layers.append(layer_index)
+                layout.texts.append(
+                    (observable.start, y, observable.label))
+
+            items = observable.items
+            xs.extend(items.positions)
+            for at, kind, index in zip(
+                    items.positions, items.kinds, items.indices):
+                if kind == KIND_AGGREGATE:
+                    count, width = items.values[index]
+                    height = bar_height(count, max_count)
+                    layout.aggregates.extend((
+                        at - width / 2, y - height / 2, width, height))
+                    layout.aggregate_layers.append(layer_index)
+                    layout.texts.append((at, y, str(count)))
+                    xs.extend([at - width / 2, at + width / 2])
+                    ys.extend([y - height / 2, y + height / 2])
+                else:
+                    layout.items.extend((at, y))
+                    layout.item_layers.append(layer_index)
+                    if kind == KIND_ITEM:
+                        layout.texts.append((at, y, str(items.values[index])))
+
+        elif type(layer) is Operator:
+            operator = layer
+            layout.operators.extend((
+                operator.start, y - operator_offset,
+                operator.end - operator.start, operator_height))
+            layout.operator_layers.append(layer_index)
+            layout.texts.append((
+                operator.start + (operator.end - operator.start) / 2,
+                y, operator.text))
+
+    if len(marble.emission_links) > 0:
+        ys.append(len(marble.layers) - 1.0 + arrow_offset)
+    if len(layout.operators) > 0:
+        ys.extend([-operator_offset, len(marble.layers) - 1.0 + 0.2])
+    layout.x_limits = expand(min(xs), max(xs))
+    layout.y_limits = expand(min(ys), max(ys))
+    return layout
+
+
+def as_layout(diagram):
+    """Returns diagram if it is a Layout, or the layout of the marble
+    diagram otherwise.
+    """
+    if isinstance(diagram, Layout):
+        return diagram
+    return create_layout(diagram)
@@ -0,0 +1,148 @@
+"""Level of detail of marble diagrams with many items.
+
+downsample() returns a copy of a built marble restricted to a time window,
+where the items of an observable falling in the same interval of this
+window are replaced with an aggregate. Aggregates are drawn as a density
+bar labelled with their number of items, so that the cost of rendering
+depends on the number of intervals rather than on the number of items.
+"""
+from bisect import bisect_left, bisect_right
+from dooble.marble import Marble, Observable, Operator, ItemList, \
+    KIND_OBSERVABLE, KIND_AGGREGATE
+from dooble import render_svg
+
+# number of items that can be drawn side by side without overlapping
+default_buckets = int(
+    (render_svg.axes_right - render_svg.axes_left) * render_svg.width
+    / (2 * render_svg.item_radius))
+
+
+def extent(marble):
+    """Returns the (start, end) positions covered by the layers of marble."""
+    starts = []
+    ends = []
+    for layer in marble.layers:
+        starts.append(layer.start)
+        ends.append(layer.end)
+        if type(layer) is Observable and len(layer.items) > 0:
+            starts.append(min(layer.items.positions))
+            ends.append(max(layer.items.positions))
+    if len(starts) == 0:
+        return 0.0, 0.0
+    return min(starts), max(ends)
+
+
+def sorted_items(items):
+    positions = items.positions
+    if all(a <= b for a, b in zip(positions, positions[1:])):
+        return items
+
+    result = ItemList()
+    order = sorted(range(len(items)), key=lambda index: positions[index])
+    for index in order:
+        copy_item(items, index, result)
+    return result
+
+
+def copy_item(items, index, result):
+    kind = items.kinds[index]
+    at = items.positions[index]
+    if kind == KIND_OBSERVABLE:
+        result.append_observable(at)
+    elif kind == KIND_AGGREGATE:
+        count, width = items.values[items.indices[index]]
+        result.append_aggregate(count, at, width)
+    else:
+        result.append_item(items.values[items.indices[index]], at)
+
+
+def downsample_items(items, window, buckets):
+    """Returns the items of window, with an aggregate for each of the
+    buckets intervals of window containing several items.
+
+    Observable items are always kept, since each of them starts a child
+    observable.
+    """
+    items = sorted_items(items)
+    positions = items.positions
+    kinds = items.kinds
+    start, end = window
+    width = (end - start) / buckets
+    result = ItemList()
+
+    low = bisect_left(positions, start)
+    for bucket in range(buckets):
+        if bucket == buckets - 1:
+            high = bisect_right(positions, end, low)
+        else:
+            high = bisect_left(positions, start + (bucket + 1) * width, low)
+        if high == low:
+            continue
+
+        bucket_kinds = kinds[low:high]
+        observables = bucket_kinds.count(KIND_OBSERVABLE)
+        aggregates = bucket_kinds.count(KIND_AGGREGATE)
+        count = high - low - observables - aggregates
+        if (aggregates == 0 and count <= 1) or width == 0.0:
+            for index in range(low, high):
+                copy_item(items, index, result)
+            low = high
+            continue
+
+        # the aggregate is placed at the middle of the bucket, between the
+        # observable items of the bucket
+        at = start + (bucket + 0.5) * width
+        kept = []
+        for index in range(low, high):
+            kind = kinds[index]
+            if kind == KIND_AGGREGATE:
+                count += items.values[items.indices[index]][0]
+            elif kind == KIND_OBSERVABLE:
+                kept.append(index)
+        before = [index for index in kept if positions[index] <= at]
+        for index in before:
+            copy_item(items, index, result)
+        result.append_aggregate(count, at, width)
+        for index in kept[len(before):]:
+            copy_item(items, index, result)
+        low = high
+
+    return result
+
+
+def downsample(marble, window=None, buckets=default_buckets):
+    """Returns a copy of marble restricted to window, where window is split
+    in buckets intervals, each one drawing at most one item or aggregate per
+    observable, besides observable items.
+
+    window is a (start, end) tuple of positions, the whole diagram by
+    default. Layers are clipped to window: terminations outside of it are
+    drawn as continued timelines.
+    """
+    if window is None:
+        window = extent(marble)
+    start, end = window
+    if end < start:
+        raise ValueError('invalid window: {}'.format(window))
+
+    def clip(at):
+        return min(max(at, start), end)
+
+    result = Marble(marble.vectorized)
+    for layer in marble.layers:
+        if type(layer) is Operator:
+            result.add_operator(
+                Operator(clip(layer.start), clip(layer.end), layer.text))
+        elif type(layer) is Observable:
+            observable = Observable(clip(layer.start), is_child=layer.is_child)
+            observable.label = layer.label
+            observable.end = clip(layer.end)
+            if layer.completed is not None and start <= layer.completed <= end:
+                observable.completed = layer.completed
+            if layer.error is not None and start <= layer.error <= end:
+                observable.error = layer.error
+            observable.items = downsample_items(layer.items, window, buckets)
+            result.add_observable(observable)
+
+    result.build()
+    return result
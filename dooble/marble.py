@@ -1,9 +1,168 @@
+from array import array
+from bisect import bisect_left
 from collections import namedtuple
 
 Item = namedtuple('Item', ['item', 'at'])
 ObsItem = namedtuple('ObsItem', ['at'])
+Aggregate = namedtuple('Aggregate', ['count', 'at', 'width'])
 Link = namedtuple('Link', [ 'from_x', 'from_y', 'to_x', 'to_y'])
 
+KIND_ITEM = 0
+KIND_OBSERVABLE = 1
+KIND_AGGREGATE = 2
+
+
+class ItemList(object):
+    """Items of an observable, stored in parallel arrays.
+
+    positions holds the position of each item, kinds its kind (KIND_ITEM,
+    KIND_OBSERVABLE or KIND_AGGREGATE), and indices the index of its value in
+    values (-1 for observables, a (count, width) tuple for aggregates). Equal
+    values are stored once. Iterating on the list yields Item, ObsItem and
+    Aggregate namedtuples.
+    """
+    __slots__ = ['positions', 'kinds', 'indices', 'values', '_value_indices']
+
+    def __init__(self):
+        self.positions = array('d')
+        self.kinds = array('b')
+        self.indices = array('i')
+        self.values = []
+        self._value_indices = {}
+
+    def _value_index(self, value):
+        try:
+            key = (type(value), value)
+            index = self._value_indices.get(key)
+        except TypeError:
+            key = None
+            index = None
+        if index is None:
+            index = len(self.values)
+            self.values.append(value)
+            if key is not None:
+                self._value_indices[key] = index
+        return index
+
+    def append_item(self, item, at):
+        self.positions.append(at)
+        self.kinds.append(KIND_ITEM)
+        self.indices.append(self._value_index(item))
+
+    def append_observable(self, at):
+        self.positions.append(at)
+        self.kinds.append(KIND_OBSERVABLE)
+        self.indices.append(-1)
+
+    def append_aggregate(self, count, at, width):
+        self.positions.append(at)
+        self.kinds.append(KIND_AGGREGATE)
+        self.indices.append(self._value_index((count, width)))
+
+    def _item(self, index):
+        kind = self.kinds[index]
+        if kind == KIND_OBSERVABLE:
+            return ObsItem(self.positions[index])
+        value = self.values[self.indices[index]]
+        if kind == KIND_AGGREGATE:
+            return Aggregate(value[0], self.positions[index], value[1])
+        return Item(value, self.positions[index])
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._item(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('item index out of range')
+        return self._item(index)
+
+    def __iter__(self):
+        values = self.values
+        for at, kind, index in zip(self.positions, self.kinds, self.indices):
+            if kind == KIND_OBSERVABLE:
+                yield ObsItem(at)
+            elif kind == KIND_AGGREGATE:
+                yield Aggregate(values[index][0], at, values[index][1])
+            else:
+                yield Item(values[index], at)
+
+
+class LinkList(object):
+    """Links stored as one array of from_x, from_y, to_x, to_y coordinates.
+
+    Iterating on the list yields Link namedtuples. as_array() returns the
+    coordinates as a (N, 4) NumPy array sharing the memory of the list: the
+    list cannot grow while this array is alive.
+    """
+    __slots__ = ['coordinates']
+
+    def __init__(self, links=()):
+        self.coordinates = array('d')
+        for link in links:
+            self.append(*link)
+
+    def append(self, from_x, from_y, to_x, to_y):
+        self.coordinates.extend((from_x, from_y, to_x, to_y))
+
+    def extend(self, links):
+        if isinstance(links, LinkList):
+            self.coordinates.extend(links.coordinates)
+        else:
+            for link in links:
+                self.append(*link)
+
+    @classmethod
+    def from_array(cls, coordinates):
+        """Returns the links of a (N, 4) array of coordinates."""
+        import numpy as np
+        links = cls()
+        coordinates = np.ascontiguousarray(coordinates, dtype=float)
+        if coordinates.size:
+            links.coordinates.frombytes(memoryview(coordinates).cast('B'))
+        return links
+
+    def as_array(self):
+        import numpy as np
+        return np.frombuffer(self.coordinates, dtype=float).reshape(-1, 4)
+
+    def _link(self, index):
+        c = self.coordinates
+        offset = index * 4
+        return Link(
+            c[offset], int(c[offset + 1]), c[offset + 2], int(c[offset + 3]))
+
+    def __len__(self):
+        return len(self.coordinates) // 4
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._link(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('link index out of range')
+        return self._link(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._link(index)
+
+    def __eq__(self, other):
+        if isinstance(other, (LinkList, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __repr__(self):
+        return 'LinkList({!r})'.format(list(self))
+
 
 class Observable(object):
     def __init__(self, start, is_child=False):
@@ -11,18 +170,25 @@ class Observable(object):
         self.start = start
         self.end = start
         self.is_child = is_child
-        self.items = []
+        self.items = ItemList()
         self.completed = None
         self.error = None
 
+    def __setattr__(self, name, value):
+        # version counts the changes of the observable, so that Marble.build
+        # only computes the links of the sections that changed. Items are
+        # only appended: they are tracked by their count.
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, 'version', getattr(self, 'version', 0) + 1)
+
     def set_label(self, label):
         self.label = label
 
     def on_next_at(self, item, at):
-        self.items.append(Item(item, at))
+        self.items.append_item(item, at)
 
     def on_observable_at(self, at):
-        self.items.append(ObsItem(at))
+        self.items.append_observable(at)
 
     def on_completed_at(self, at):
         self.completed = at
@@ -43,11 +209,39 @@ class Operator(object):
         self.text = text
 
 
+# the links of a section are stored in the links of the marble: a section
+# only keeps their (offset, count) in each LinkList
+BuiltSection = namedtuple(
+    'BuiltSection', ['signature', 'higher_order_range', 'emission_range'])
+
+
+# sections of at least this number of items have their links computed with
+# NumPy, when vectorized is None
+vectorize_threshold = 512
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
 class Marble(object):
-    def __init__(self):
+    """Layers of observables and operators, and the links between them.
+
+    vectorized selects how the links are computed: with NumPy when True, in
+    pure Python when False, and depending on the size of each section when
+    None.
+    """
+
+    def __init__(self, vectorized=None):
+        self.vectorized = vectorized
         self.layers = []
-        self.higher_order_links = []
-        self.emission_links = []
+        self.higher_order_links = LinkList()
+        self.emission_links = LinkList()
+        self.built_sections = []
         return
 
     def add_observable(self, observable):
@@ -56,76 +250,272 @@ class Marble(object):
     def add_operator(self, operator):
         self.layers.append(operator)
 
-    def _compute_higher_order_links(self):
+    def reuse_links(self, other):
+        """Starts from the links of other, a built previous version of this
+        marble sharing its unchanged layers, so that build only computes the
+        links of the sections that differ.
+        """
+        self.built_sections = list(other.built_sections)
+        self.higher_order_links = LinkList()
+        self.higher_order_links.extend(other.higher_order_links)
+        self.emission_links = LinkList()
+        self.emission_links.extend(other.emission_links)
+
+    def _sections(self):
+        """Returns the (begin, end, top_layer, bottom_layer) ranges of the
+        layers between operators, with the indices of these operators.
+        """
+        sections = []
+        begin = 0
+        top_layer = None
+        for layer_index, layer in enumerate(self.layers):
+            if type(layer) is Operator:
+                sections.append((begin, layer_index, top_layer, layer_index))
+                begin = layer_index + 1
+                top_layer = layer_index
+        sections.append((begin, len(self.layers), top_layer, None))
+        return sections
+
+    def _signature(self, section):
+        begin, end, _, _ = section
+        return section, tuple(
+            (layer, layer.version, len(layer.items))
+            for layer in self.layers[begin:end]
+            if type(layer) is Observable)
+
+    def _is_vectorized(self, begin, end):
+        if self.vectorized is not None:
+            return self.vectorized
+        count = 0
+        for layer in self.layers[begin:end]:
+            if type(layer) is Observable:
+                count += len(layer.items)
+        return count >= vectorize_threshold and _numpy() is not None
+
+    def _section_higher_order_links(self, begin, end):
+        if self._is_vectorized(begin, end):
+            return self._numpy_higher_order_links(begin, end)
+        return self._python_higher_order_links(begin, end)
+
+    def _section_emission_links(self, begin, end, top_layer, bottom_layer):
+        if self._is_vectorized(begin, end):
+            return self._numpy_emission_links(
+                begin, end, top_layer, bottom_layer)
+        return self._python_emission_links(
+            begin, end, top_layer, bottom_layer)
+
+    def _python_higher_order_links(self, begin, end):
         def nearest_links(parents, childs):
-            links = []
+            # childs are sorted by start, stable so that the first child in
+            # layer order wins between childs at the same distance.
+            childs = sorted(childs, key=lambda child: child[0])
+            starts = [child[0] for child in childs]
+            links = LinkList()
             for parent in parents:
+                index = bisect_left(starts, parent[0])
                 nearest = None
-                for child in childs:
-                    if nearest is None or abs(parent[0] - child[0]) < abs(parent[0] - nearest[0]):
-                        nearest = child
+                if index > 0:
+                    left = bisect_left(starts, starts[index - 1], 0, index)
+                    nearest = childs[left]
+                if index < len(childs):
+                    right = childs[index]
+                    if nearest is None:
+                        nearest = right
+                    else:
+                        left_distance = abs(parent[0] - nearest[0])
+                        right_distance = abs(parent[0] - right[0])
+                        if right_distance < left_distance or (
+                                right_distance == left_distance
+                                and right[1] < nearest[1]):
+                            nearest = right
 
                 if nearest is not None:
-                    links.append(Link(
-                        from_x=parent[0], from_y=parent[1],
-                        to_x=nearest[0], to_y=nearest[1],
-                    ))
+                    links.append(parent[0], parent[1], nearest[0], nearest[1])
 
             return links
 
         childs = []
         parents = []
-        links = []
-        for layer_index, layer in enumerate(self.layers):
-            if type(layer) is Operator:
-                links.extend(nearest_links(parents, childs))
-                childs = []
-                parents = []
-            elif type(layer) is Observable:
+        for layer_index in range(begin, end):
+            layer = self.layers[layer_index]
+            if type(layer) is Observable:
                 if layer.is_child is True:
                     childs.append((layer.start, layer_index))
                 else:
-                    for item in layer.items:
-                        if type(item) is ObsItem:
-                            parents.append((item.at, layer_index))
-
-        links.extend(nearest_links(parents, childs))
-        return links
+                    items = layer.items
+                    for at, kind in zip(items.positions, items.kinds):
+                        if kind == KIND_OBSERVABLE:
+                            parents.append((at, layer_index))
 
-    def _compute_emmision_links(self):
-        def emission_links(top_layer, bottom_layer, items):
-            links = []
-            for item in items:                
-                if top_layer is not None:
-                    links.append(Link(
-                        from_x=item[0], from_y=top_layer,
-                        to_x=item[0], to_y=item[1],
-                    ))
-                if bottom_layer is not None:
-                    links.append(Link(
-                        from_x=item[0], from_y=item[1],
-                        to_x=item[0], to_y=bottom_layer,
-                    ))
-            return links
+        return nearest_links(parents, childs)
 
-        top_layer = None
+    def _python_emission_links(self, begin, end, top_layer, bottom_layer):
         items = []
-        links = []
-        for layer_index, layer in enumerate(self.layers):
-            if type(layer) is Operator:
-                links.extend(emission_links(top_layer, layer_index, items))
-                items = []
-                top_layer = layer_index
-            elif type(layer) is Observable:
+        for layer_index in range(begin, end):
+            layer = self.layers[layer_index]
+            if type(layer) is Observable:
                 if layer.label is not None:
                     items.append((layer.start, layer_index))
                 else:
-                    for item in layer.items:
-                        items.append((item.at, layer_index))
+                    for at in layer.items.positions:
+                        items.append((at, layer_index))
 
-        links.extend(emission_links(top_layer, None, items))
+        links = LinkList()
+        for item in items:
+            if top_layer is not None:
+                links.append(item[0], top_layer, item[0], item[1])
+            if bottom_layer is not None:
+                links.append(item[0], item[1], item[0], bottom_layer)
+        return links
+
+    def _numpy_higher_order_links(self, begin, end):
+        import numpy as np
+        child_starts = []
+        child_layers = []
+        parent_positions = []
+        parent_layers = []
+        for layer_index in range(begin, end):
+            layer = self.layers[layer_index]
+            if type(layer) is Observable:
+                if layer.is_child is True:
+                    child_starts.append(layer.start)
+                    child_layers.append(layer_index)
+                else:
+                    items = layer.items
+                    positions = np.frombuffer(items.positions, dtype=float)
+                    kinds = np.frombuffer(items.kinds, dtype=np.int8)
+                    positions = positions[kinds == KIND_OBSERVABLE]
+                    parent_positions.append(positions)
+                    parent_layers.append(
+                        np.full(len(positions), layer_index, dtype=float))
+        if not child_starts or not parent_positions:
+            return LinkList()
+
+        # same nearest child as the bisect of _python_higher_order_links:
+        # the first child in layer order wins between childs at the same
+        # distance.
+        order = np.argsort(child_starts, kind='mergesort')
+        starts = np.array(child_starts, dtype=float)[order]
+        layers = np.array(child_layers, dtype=float)[order]
+        positions = np.concatenate(parent_positions)
+        index = np.searchsorted(starts, positions, side='left')
+        right = np.minimum(index, len(starts) - 1)
+        left = np.searchsorted(
+            starts, starts[np.maximum(index - 1, 0)], side='left')
+        left_distance = np.abs(positions - starts[left])
+        right_distance = np.abs(positions - starts[right])
+        use_right = (index == 0) | (index < len(starts)) & (
+            (right_distance < left_distance)
+            | (right_distance == left_distance)
+            & (layers[right] < layers[left]))
+        nearest = np.where(use_right, right, left)
+
+        coordinates = np.empty((len(positions), 4))
+        coordinates[:, 0] = positions
+        coordinates[:, 1] = np.concatenate(parent_layers)
+        coordinates[:, 2] = starts[nearest]
+        coordinates[:, 3] = layers[nearest]
+        return LinkList.from_array(coordinates)
+
+    def _numpy_emission_links(self, begin, end, top_layer, bottom_layer):
+        import numpy as np
+        positions = []
+        item_layers = []
+        for layer_index in range(begin, end):
+            layer = self.layers[layer_index]
+            if type(layer) is Observable:
+                if layer.label is not None:
+                    at = np.array([layer.start], dtype=float)
+                else:
+                    at = np.frombuffer(layer.items.positions, dtype=float)
+                positions.append(at)
+                item_layers.append(np.full(len(at), layer_index, dtype=float))
+        ends = [y for y in (top_layer, bottom_layer) if y is not None]
+        if not positions or not ends:
+            return LinkList()
+
+        # links of each item are consecutive, the top one first
+        positions = np.concatenate(positions)
+        item_layers = np.concatenate(item_layers)
+        coordinates = np.empty((len(positions), len(ends), 4))
+        coordinates[:, :, 0] = positions[:, None]
+        coordinates[:, :, 2] = positions[:, None]
+        if top_layer is not None:
+            coordinates[:, 0, 1] = top_layer
+            coordinates[:, 0, 3] = item_layers
+        if bottom_layer is not None:
+            coordinates[:, -1, 1] = item_layers
+            coordinates[:, -1, 3] = bottom_layer
+        return LinkList.from_array(coordinates.reshape(-1, 4))
+
+    def _compute_higher_order_links(self):
+        links = LinkList()
+        for begin, end, _, _ in self._sections():
+            links.extend(self._section_higher_order_links(begin, end))
+        return links
+
+    def _compute_emmision_links(self):
+        links = LinkList()
+        for section in self._sections():
+            links.extend(self._section_emission_links(*section))
         return links
 
     def build(self):
-        self.higher_order_links = self._compute_higher_order_links()
-        self.emission_links = self._compute_emmision_links()
+        """Computes the links of the marble.
+
+        The links of each section of layers between operators are kept, and
+        only the ones of the sections that changed since the previous build
+        are computed again: the layers of the section, their observables or
+        the position of the section.
+        """
+        signatures = [self._signature(s) for s in self._sections()]
+        built = self.built_sections
+        first = 0
+        while first < len(built) and first < len(signatures) \
+                and built[first].signature == signatures[first]:
+            first += 1
+        if first == len(built) == len(signatures):
+            return
+
+        # links of the sections before the first change are kept in place,
+        # the ones after it are moved, or computed again
+        higher_order_links = self.higher_order_links.coordinates
+        emission_links = self.emission_links.coordinates
+        if first < len(built):
+            higher_order_start = built[first].higher_order_range[0] * 4
+            emission_start = built[first].emission_range[0] * 4
+        else:
+            higher_order_start = len(higher_order_links)
+            emission_start = len(emission_links)
+        higher_order_tail = higher_order_links[higher_order_start:]
+        emission_tail = emission_links[emission_start:]
+        del higher_order_links[higher_order_start:]
+        del emission_links[emission_start:]
+
+        sections = built[:first]
+        for index in range(first, len(signatures)):
+            signature = signatures[index]
+            higher_order_offset = len(self.higher_order_links)
+            emission_offset = len(self.emission_links)
+            if index < len(built) and built[index].signature == signature:
+                offset, count = built[index].higher_order_range
+                higher_order_links.extend(higher_order_tail[
+                    offset * 4 - higher_order_start:
+                    (offset + count) * 4 - higher_order_start])
+                offset, count = built[index].emission_range
+                emission_links.extend(emission_tail[
+                    offset * 4 - emission_start:
+                    (offset + count) * 4 - emission_start])
+            else:
+                begin, end, top_layer, bottom_layer = signature[0]
+                self.higher_order_links.extend(
+                    self._section_higher_order_links(begin, end))
+                self.emission_links.extend(self._section_emission_links(
+                    begin, end, top_layer, bottom_layer))
+            sections.append(BuiltSection(
+                signature,
+                (higher_order_offset,
+                 len(self.higher_order_links) - higher_order_offset),
+                (emission_offset,
+                 len(self.emission_links) - emission_offset)))
+        self.built_sections = sections
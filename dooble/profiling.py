@@ -0,0 +1,145 @@
+"""Timings of the stages of the rendering of diagrams.
+
+A Profiler records the wall time of each stage (parsing, creation of the
+marble, computation of its links, rendering), and optionally its peak
+memory with tracemalloc and its cProfile statistics. Hooks are called with
+each Timing as soon as it is recorded.
+"""
+import os
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+Timing = namedtuple('Timing', ['stage', 'duration', 'peak_memory'])
+
+stages = ['Idl.parse', 'create_marble_from_ast', 'Marble.build',
+          'render_to_file']
+
+
+class NullProfiler(object):
+    """Profiler that records nothing, used when no profiler is given."""
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+
+null_profiler = NullProfiler()
+
+
+class Profiler(object):
+    """Records the timings of stages.
+
+    With memory set, the peak memory allocated by Python during each stage
+    is traced, which slows the stages down. With profile set, each stage is
+    also profiled with cProfile, the statistics of all the runs of a stage
+    being accumulated.
+    """
+
+    def __init__(self, memory=False, profile=False, hooks=()):
+        self.memory = memory
+        self.profiles = {} if profile else None
+        self.hooks = list(hooks)
+        self.timings = []
+
+    def add_hook(self, hook):
+        """Calls hook with each Timing recorded from now."""
+        self.hooks.append(hook)
+
+    def record(self, timing):
+        self.timings.append(timing)
+        for hook in self.hooks:
+            hook(timing)
+
+    @contextmanager
+    def stage(self, name):
+        if self.memory:
+            import tracemalloc
+            started = not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start()
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+            else:
+                tracemalloc.clear_traces()
+                baseline = 0
+        profile = None
+        if self.profiles is not None:
+            import cProfile
+            profile = self.profiles.setdefault(name, cProfile.Profile())
+            profile.enable()
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+            peak_memory = None
+            if self.memory:
+                peak_memory = tracemalloc.get_traced_memory()[1] - baseline
+                if started:
+                    tracemalloc.stop()
+            self.record(Timing(name, duration, peak_memory))
+
+    def summary(self):
+        """Returns the statistics of the timings of each stage, the stages
+        of the rendering first.
+        """
+        by_stage = {}
+        for timing in self.timings:
+            by_stage.setdefault(timing.stage, []).append(timing)
+
+        names = [s for s in stages if s in by_stage]
+        names += sorted(s for s in by_stage if s not in stages)
+        summary = []
+        for name in names:
+            timings = by_stage[name]
+            durations = [timing.duration for timing in timings]
+            memories = [
+                timing.peak_memory for timing in timings
+                if timing.peak_memory is not None]
+            summary.append({
+                'stage': name,
+                'count': len(timings),
+                'total': sum(durations),
+                'mean': sum(durations) / len(durations),
+                'max': max(durations),
+                'peak_memory': max(memories) if memories else None,
+            })
+        return summary
+
+    def to_json(self):
+        return {
+            'summary': self.summary(),
+            'timings': [timing._asdict() for timing in self.timings],
+        }
+
+    def dump_profiles(self, directory):
+        """Writes the cProfile statistics of each stage to directory, in
+        files named after the stages. Returns the names of these files.
+        """
+        os.makedirs(directory, exist_ok=True)
+        filenames = []
+        for name, profile in sorted((self.profiles or {}).items()):
+            filename = os.path.join(directory, '{}.prof'.format(name))
+            profile.dump_stats(filename)
+            filenames.append(filename)
+        return filenames
+
+
+def format_summary(summary):
+    """Returns summary as a text table."""
+    lines = ['{:<24} {:>7} {:>10} {:>10} {:>10} {:>12}'.format(
+        'stage', 'count', 'total (s)', 'mean (ms)', 'max (ms)',
+        'peak (KiB)')]
+    for stage in summary:
+        peak_memory = '-' if stage['peak_memory'] is None \
+            else '{:.1f}'.format(stage['peak_memory'] / 1024)
+        lines.append(
+            '{:<24} {:>7} {:>10.3f} {:>10.3f} {:>10.3f} {:>12}'.format(
+                stage['stage'], stage['count'], stage['total'],
+                stage['mean'] * 1000, stage['max'] * 1000, peak_memory))
+    return '\n'.join(lines)
@@ -1,98 +1,197 @@
-import matplotlib.pyplot as plt
-from matplotlib.patches import Rectangle
-import numpy as np
-from dooble.marble import Operator, Observable, Item
+import math
+import os
+from dooble import render_svg
+from dooble.layout import as_layout
 
-area = np.pi*100
-end_area = np.pi*50
+# matplotlib and numpy are imported only when a diagram is drawn: importing
+# them costs more than parsing, and is not needed to render SVG.
 
+dpi = 100
+area = math.pi*100
+backends = ['matplotlib', 'raster']
+end_area = math.pi*50
 
-def render_to_file(marble, filename, theme):
-    height = len(marble.layers) * 0.7
-    fig, ax = plt.subplots(figsize=(6.4, height), dpi=100)
 
-    def plt_y(y):
-        return len(marble.layers) - y - 1
+def new_figure():
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(dpi=dpi)
+    FigureCanvasAgg(fig)
+    return fig
 
-    # higher observable links    
-    for link in marble.higher_order_links:
-        ax.plot(
-            [link.from_x, link.to_x],
-            [plt_y(link.from_y), plt_y(link.to_y)],
-            color=theme.timeline_color, linestyle='-',
-            linewidth='2', zorder=0)
+
+def draw(fig, diagram, theme, x_limits=None):
+    """Draws diagram, a marble or its layout, on fig, framed by the limits of
+    the layout. With x_limits, the horizontal axis is fixed to these (start,
+    end) positions instead, and the elements outside of them are clipped.
+    """
+    import numpy as np
+    from matplotlib.collections import LineCollection
+    from matplotlib.patches import Rectangle
+
+    layout = as_layout(diagram)
+    fig.clear()
+    fig.set_size_inches(layout.width, layout.height)
+    ax = fig.add_subplot(1, 1, 1)
+
+    def add_lines(segments, **kwargs):
+        if len(segments) > 0:
+            ax.add_collection(
+                LineCollection(segments, zorder=0, **kwargs), autolim=False)
+
+    def add_markers(xy, **kwargs):
+        if len(xy) > 0:
+            ax.scatter(xy[:, 0], xy[:, 1], **kwargs)
+
+    # higher observable links
+    add_lines(
+        layout.as_array('higher_order_links', 4).reshape(-1, 2, 2),
+        colors=[theme.timeline_color], linestyles='-',
+        linewidths=2, capstyle='projecting')
 
     # emission links
-    for link in marble.emission_links:
-        ax.plot(
-            [link.from_x, link.to_x],
-            [plt_y(link.from_y), plt_y(link.to_y)],
-            color=theme.emission_color, linestyle=':',
-            linewidth='1', zorder=0)
-        ax.scatter(
-            [link.to_x], [plt_y(link.to_y) + 0.3],
-            color=theme.emission_color, marker='v', linewidth='1')
-
-    for layer_index, layer in enumerate(marble.layers):
-        if type(layer) is Observable:
-            observable = layer
-            # time line
-            ax.plot(
-                [observable.start, observable.end],
-                [plt_y(layer_index), plt_y(layer_index)],
-                color=theme.timeline_color, linestyle='-',
-                linewidth='2',
-                zorder=0)
-
-            # end marker
-            if observable.completed is not None:
-                ax.scatter(
-                    [observable.completed], [plt_y(layer_index)],
-                    s=end_area, color=theme.timeline_color, marker='|', linewidth='2')
-            elif observable.error is not None:
-                ax.scatter(
-                    [observable.error], [plt_y(layer_index)], 
-                    s=end_area, color=theme.timeline_color, marker='x', linewidth='2')
-            else:
-                ax.scatter(
-                    [observable.end], [plt_y(layer_index)],
-                    s=end_area, color=theme.timeline_color, marker='>')
-
-            # items
-            x = []
-            y = []
-            for item in observable.items:
-                x.append(item.at)
-                y.append(plt_y(layer_index))
-            ax.scatter(x, y, s=area, c=None, edgecolors=theme.timeline_color, color=theme.item_color, alpha=1.0, linewidth='2')
-
-            # label
-            if observable.label is not None:
-                ax.scatter(
-                    [observable.start], [plt_y(layer_index)], s=area, c=None, 
-                    edgecolors=theme.operator_edge_color, 
-                    color=theme.label_color, 
-                    alpha=1.0, linewidth='2')
-                ax.text(observable.start, plt_y(layer_index), observable.label, horizontalalignment='center', verticalalignment='center')
-
-            # items text
-            for item in observable.items:
-                text = str(item.item) if type(item) is Item else ''
-                ax.text(item.at, plt_y(layer_index), text, horizontalalignment='center', verticalalignment='center')
-
-        elif type(layer) is Operator:
-            operator = layer
-            y = plt_y(layer_index) - 0.15
-            ax.add_patch(Rectangle(
-                (operator.start, y), operator.end-operator.start, 0.35,
-                alpha=1, edgecolor=theme.operator_edge_color,
-                facecolor=theme.operator_color,
-                linewidth='2'))
-            ax.text(
-                operator.start + (operator.end-operator.start)/2, y + 0.15,
-                operator.text,
-                horizontalalignment='center', verticalalignment='center')
+    add_lines(
+        layout.as_array('emission_links', 4).reshape(-1, 2, 2),
+        colors=[theme.emission_color], linestyles=':', linewidths=1)
+
+    # time lines
+    add_lines(
+        layout.as_array('timelines', 4).reshape(-1, 2, 2),
+        colors=[theme.timeline_color], linestyles='-',
+        linewidths=2, capstyle='projecting')
+
+    # emission arrows
+    add_markers(
+        layout.as_array('arrows', 2),
+        color=theme.emission_color, marker='v', linewidth=1)
+
+    # end markers
+    ends = layout.as_array('ends', 2)
+    end_kinds = np.array(layout.end_kinds, dtype=object)
+    add_markers(
+        ends[end_kinds == '|'],
+        s=end_area, color=theme.timeline_color, marker='|', linewidth=2)
+    add_markers(
+        ends[end_kinds == 'x'],
+        s=end_area, color=theme.timeline_color, marker='x', linewidth=2)
+    add_markers(
+        ends[end_kinds == '>'],
+        s=end_area, color=theme.timeline_color, marker='>')
+
+    # items
+    add_markers(
+        layout.as_array('items', 2), s=area, c=None,
+        edgecolors=theme.timeline_color, color=theme.item_color,
+        alpha=1.0, linewidth=2)
+
+    # labels
+    add_markers(
+        layout.as_array('labels', 2), s=area, c=None,
+        edgecolors=theme.operator_edge_color, color=theme.label_color,
+        alpha=1.0, linewidth=2)
+
+    # density bars
+    for x, y, width, height in layout.as_array('aggregates', 4):
+        ax.add_patch(Rectangle(
+            (x, y), width, height,
+            alpha=1, edgecolor=theme.timeline_color,
+            facecolor=theme.item_color, linewidth=2))
+
+    for x, y, width, height in layout.as_array('operators', 4):
+        ax.add_patch(Rectangle(
+            (x, y), width, height,
+            alpha=1, edgecolor=theme.operator_edge_color,
+            facecolor=theme.operator_color, linewidth=2))
+
+    ax.set_xlim(layout.x_limits if x_limits is None else x_limits)
+    ax.set_ylim(layout.y_limits)
+    clip_on = x_limits is not None
+
+    for x, y, text in layout.texts:
+        ax.text(
+            x, y, text,
+            horizontalalignment='center', verticalalignment='center',
+            clip_on=clip_on)
 
     ax.set_axis_off()
-    plt.savefig(filename, dpi=fig.dpi)
-    plt.close()
+
+
+def output_format(filename):
+    return os.path.splitext(filename)[1][1:].lower()
+
+
+def check_backend(backend):
+    if backend not in backends:
+        raise ValueError('unknown backend: {}'.format(backend))
+
+
+def render_to_file(marble, filename, theme, fig=None, x_limits=None,
+                   backend='matplotlib'):
+    """Renders marble, or its dooble.layout layout, to filename, in the
+    format of its extension.
+
+    Raster formats are drawn by backend: 'matplotlib', or 'raster' which
+    draws with Pillow instead, see dooble.render_raster.
+    """
+    check_backend(backend)
+    if output_format(filename) == 'svg':
+        render_svg.render_to_file(marble, filename, theme, x_limits=x_limits)
+        return
+    if backend == 'raster':
+        from dooble import render_raster
+        render_raster.render_to_file(
+            marble, filename, theme, dpi=dpi, x_limits=x_limits)
+        return
+
+    if fig is None:
+        fig = new_figure()
+    draw(fig, marble, theme, x_limits=x_limits)
+    fig.savefig(filename, dpi=fig.dpi)
+
+
+def render_to_buffer(marble, fileobj, theme, fmt='png', dpi=dpi, fig=None,
+                     x_limits=None, backend='matplotlib'):
+    """Writes the fmt rendering of marble to fileobj, a binary file object
+    such as a BytesIO.
+
+    Unless fig is provided, the diagram is drawn on a figure of its own, not
+    managed by pyplot, so that several threads can render at the same time.
+    """
+    check_backend(backend)
+    if fmt == 'svg':
+        fileobj.write(render_svg.render_to_string(
+            marble, theme, x_limits=x_limits).encode('utf-8'))
+        return
+    if backend == 'raster':
+        from dooble import render_raster
+        render_raster.render_to_buffer(
+            marble, fileobj, theme, fmt=fmt, dpi=dpi, x_limits=x_limits)
+        return
+
+    if fig is None:
+        fig = new_figure()
+    draw(fig, marble, theme, x_limits=x_limits)
+    fig.savefig(fileobj, format=fmt, dpi=dpi)
+
+
+def render_to_bytes(marble, theme, fmt='png', dpi=dpi, fig=None,
+                    x_limits=None, backend='matplotlib'):
+    """Returns the fmt rendering of marble, see render_to_buffer."""
+    from io import BytesIO
+    buffer = BytesIO()
+    render_to_buffer(
+        marble, buffer, theme, fmt=fmt, dpi=dpi, fig=fig, x_limits=x_limits,
+        backend=backend)
+    return buffer.getvalue()
+
+
+def render_many(marbles, filenames, theme):
+    """Renders each marble to the corresponding file.
+
+    All diagrams are drawn on the same figure, cleared between each of them.
+    marbles can be a generator, so that each diagram is parsed only when it
+    is about to be rendered.
+    """
+    fig = new_figure()
+    for marble, filename in zip(marbles, filenames):
+        render_to_file(marble, filename, theme, fig=fig)
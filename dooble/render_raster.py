@@ -0,0 +1,242 @@
+"""Raster rendering of marble diagrams with Pillow, without matplotlib.
+
+The layout of the diagram is drawn as by dooble.render_svg, on an image
+supersample times larger than the output, which is then reduced so that
+lines, circles and polygons are antialiased. Texts are drawn after the
+reduction, from a cache of the masks of the labels already rendered.
+"""
+import math
+import os
+from functools import lru_cache
+from dooble import render_svg
+from dooble.layout import as_layout
+from dooble.render_svg import Canvas, create_canvas, draw
+
+dpi = 100
+supersample = 3
+font_names = ['DejaVuSans.ttf', 'Vera.ttf']
+text_color = (0, 0, 0)
+
+
+def color(rgb):
+    return tuple(int(round(c * 0xFF)) for c in rgb)
+
+
+@lru_cache(maxsize=None)
+def load_font(size):
+    """Returns the font of the texts, size pixels high."""
+    from PIL import ImageFont
+    for name in font_names:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            pass
+    return ImageFont.load_default()
+
+
+@lru_cache(maxsize=4096)
+def text_mask(text, size):
+    """Returns the mask of text drawn with the font of size pixels, and the
+    offset of its top left corner from its center.
+    """
+    from PIL import Image, ImageDraw
+    font = load_font(size)
+    left, top, right, bottom = font.getbbox(text)
+    mask = Image.new('L', (max(1, right - left), max(1, bottom - top)))
+    ImageDraw.Draw(mask).text((-left, -top), text, fill=255, font=font)
+    return mask, (-(right - left) / 2, -(bottom - top) / 2)
+
+
+def dashes(x1, y1, x2, y2, pattern):
+    """Yields the (x1, y1, x2, y2) dashes of a line, pattern being the
+    lengths of the dashes and of the gaps between them.
+    """
+    length = math.hypot(x2 - x1, y2 - y1)
+    if length == 0:
+        return
+    dx, dy = (x2 - x1) / length, (y2 - y1) / length
+    position = 0.0
+    index = 0
+    while position < length:
+        end = min(position + pattern[index % len(pattern)], length)
+        if index % 2 == 0:
+            yield (x1 + dx * position, y1 + dy * position,
+                   x1 + dx * end, y1 + dy * end)
+        position = end
+        index += 1
+
+
+@lru_cache(maxsize=256)
+def dash_mask(length, width, pattern):
+    """Returns the mask of a vertical dashed line of length and width
+    pixels, stamped for each dashed line of this length.
+    """
+    from PIL import Image, ImageDraw
+    mask = Image.new('L', (max(1, width), max(1, length)))
+    draw = ImageDraw.Draw(mask)
+    for _, y1, _, y2 in dashes(0, 0, 0, length, pattern):
+        draw.rectangle(
+            [0, int(round(y1)), width - 1, int(round(y2)) - 1], fill=255)
+    return mask
+
+
+class RasterCanvas(Canvas):
+    """Draws on a Pillow image of dpi resolution."""
+    color = staticmethod(color)
+
+    def __init__(self, height, x_limits, y_limits, clip=False, dpi=dpi,
+                 supersample=supersample):
+        from PIL import Image, ImageDraw
+        super(RasterCanvas, self).__init__(height, x_limits, y_limits, clip)
+        self.dpi = dpi
+        self.supersample = supersample
+        self.scale = dpi / 72 * supersample
+        self.size = (
+            int(round(render_svg.width * dpi / 72)),
+            int(round(height * dpi / 72)))
+        self.image = Image.new(
+            'RGB',
+            (self.size[0] * supersample, self.size[1] * supersample),
+            (0xFF, 0xFF, 0xFF))
+        self.draw = ImageDraw.Draw(self.image)
+        self.texts = []
+
+    def point(self, x, y, dx=0.0, dy=0.0):
+        return (
+            (self.x(x) + dx) * self.scale, (self.y(y) + dy) * self.scale)
+
+    def segment(self, p1, p2, fill, width, cap=0.0):
+        """Draws a segment of width pixels as a polygon, extended by cap
+        pixels at both ends.
+        """
+        (x1, y1), (x2, y2) = p1, p2
+        length = math.hypot(x2 - x1, y2 - y1)
+        if length == 0:
+            if cap > 0:
+                self.draw.rectangle(
+                    [x1 - cap, y1 - cap, x1 + cap, y1 + cap], fill=fill)
+            return
+        dx, dy = (x2 - x1) / length, (y2 - y1) / length
+        x1, y1, x2, y2 = x1 - dx * cap, y1 - dy * cap, \
+            x2 + dx * cap, y2 + dy * cap
+        nx, ny = -dy * width / 2, dx * width / 2
+        self.draw.polygon(
+            [(x1 + nx, y1 + ny), (x2 + nx, y2 + ny),
+             (x2 - nx, y2 - ny), (x1 - nx, y1 - ny)],
+            fill=fill)
+
+    def line(self, x1, y1, x2, y2, stroke, width, dasharray=None,
+             linecap='square'):
+        p1, p2 = self.point(x1, y1), self.point(x2, y2)
+        stroke_width = width * self.scale
+        cap = stroke_width / 2 if linecap == 'square' else 0.0
+        if dasharray is None:
+            self.segment(p1, p2, stroke, stroke_width, cap)
+            return
+        pattern = tuple(float(d) * self.scale for d in dasharray.split(','))
+        if p1[0] == p2[0] and cap == 0.0:
+            # emission links are vertical: their dashes are stamped at once
+            top = min(p1[1], p2[1])
+            w = int(round(stroke_width))
+            mask = dash_mask(
+                int(round(abs(p2[1] - p1[1]))), max(1, w), pattern)
+            self.image.paste(
+                stroke, (int(round(p1[0] - w / 2)), int(round(top))), mask)
+            return
+        for dash in dashes(p1[0], p1[1], p2[0], p2[1], pattern):
+            self.segment(dash[:2], dash[2:], stroke, stroke_width, cap)
+
+    def circle(self, x, y, radius, fill, stroke, width):
+        cx, cy = self.point(x, y)
+        stroke_width = width * self.scale
+        # the stroke is centered on the circle, as in SVG
+        r = radius * self.scale + stroke_width / 2
+        self.draw.ellipse(
+            [cx - r, cy - r, cx + r, cy + r], fill=fill, outline=stroke,
+            width=int(round(stroke_width)))
+
+    def polygon(self, x, y, points, fill, stroke, width):
+        points = [self.point(x, y, px, py) for px, py in points]
+        self.draw.polygon(points, fill=fill)
+        stroke_width = width * self.scale
+        for p1, p2 in zip(points, points[1:] + points[:1]):
+            self.segment(p1, p2, stroke, stroke_width, stroke_width / 2)
+
+    def mark(self, x, y, segments, stroke, width):
+        for (x1, y1), (x2, y2) in segments:
+            self.segment(
+                self.point(x, y, x1, y1), self.point(x, y, x2, y2),
+                stroke, width * self.scale)
+
+    def rect(self, x, y, w, h, fill, stroke, width):
+        x1, y1 = self.point(x, y + h)
+        x2, y2 = self.point(x + w, y)
+        half = width * self.scale / 2
+        self.draw.rectangle(
+            [x1 - half, y1 - half, x2 + half, y2 + half], fill=fill,
+            outline=stroke, width=int(round(2 * half)))
+
+    def text(self, x, y, text):
+        # drawn at the output resolution, once shapes are reduced
+        self.texts.append((self.x(x), self.y(y), text))
+
+    def to_image(self):
+        from PIL import Image
+        image = self.image.resize(self.size, Image.BOX)
+        scale = self.dpi / 72
+        size = int(round(render_svg.font_size * scale))
+        for x, y, text in self.texts:
+            mask, (dx, dy) = text_mask(text, size)
+            image.paste(
+                text_color,
+                (int(round(x * scale + dx)), int(round(y * scale + dy))),
+                mask)
+
+        if self.clip:
+            # the elements outside of the horizontal limits are hidden
+            left = int(round(self.left * scale))
+            right = int(round(
+                render_svg.axes_right * render_svg.width * scale))
+            white = (0xFF, 0xFF, 0xFF)
+            image.paste(white, (0, 0, left, self.size[1]))
+            image.paste(white, (right, 0, self.size[0], self.size[1]))
+        return image
+
+
+def render_to_image(diagram, theme, dpi=dpi, x_limits=None,
+                    supersample=supersample):
+    """Returns diagram, a marble or its layout, drawn on a Pillow image of
+    dpi resolution. With x_limits, the horizontal axis is fixed to these
+    (start, end) positions instead of fitting the diagram, and the elements
+    outside of them are clipped.
+    """
+    layout = as_layout(diagram)
+    canvas = create_canvas(
+        RasterCanvas, layout, x_limits, dpi=dpi, supersample=supersample)
+    draw(canvas, layout, theme)
+    return canvas.to_image()
+
+
+def image_format(fmt):
+    from PIL import Image
+    extensions = Image.registered_extensions()
+    try:
+        return extensions['.' + fmt.lower()]
+    except KeyError:
+        raise ValueError('unsupported raster format: {}'.format(fmt))
+
+
+def render_to_buffer(diagram, fileobj, theme, fmt='png', dpi=dpi,
+                     x_limits=None):
+    """Writes the fmt rendering of diagram, a marble or its layout, to
+    fileobj, a binary file object.
+    """
+    image = render_to_image(diagram, theme, dpi=dpi, x_limits=x_limits)
+    image.save(fileobj, format=image_format(fmt), dpi=(dpi, dpi))
+
+
+def render_to_file(diagram, filename, theme, dpi=dpi, x_limits=None):
+    fmt = os.path.splitext(filename)[1][1:] or 'png'
+    with open(filename, 'wb') as image_file:
+        render_to_buffer(
+            diagram, image_file, theme, fmt=fmt, dpi=dpi, x_limits=x_limits)
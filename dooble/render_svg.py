@@ -0,0 +1,259 @@
+"""SVG rendering of marble diagrams, without matplotlib.
+
+The layout follows the one of dooble.render: same figure size, same axes
+position within the figure, and the same marker sizes, line widths and font
+size, expressed in points.
+"""
+import math
+from dooble import layout as layouts
+
+width = layouts.figure_width * 72
+axes_left = 0.125
+axes_right = 0.9
+axes_bottom = 0.11
+axes_top = 0.88
+
+item_radius = math.sqrt(math.pi * 100) / 2
+end_size = math.sqrt(math.pi * 50)
+arrow_size = 6.0
+font_size = 10.0
+
+
+def escape(text):
+    return text.replace('&', '&amp;').replace('<', '&lt;') \
+        .replace('>', '&gt;').replace('"', '&quot;')
+
+
+def color(rgb):
+    return '#{:02x}{:02x}{:02x}'.format(
+        *(int(round(c * 0xFF)) for c in rgb))
+
+
+def fmt(value):
+    return '{:.2f}'.format(value)
+
+
+class Canvas(object):
+    """Maps data coordinates to points, from the top left corner of the
+    figure. Subclasses draw lines, circles, polygons, marks, rectangles and
+    texts, with colors converted by color().
+    """
+
+    def __init__(self, height, x_limits, y_limits, clip=False):
+        self.height = height
+        self.clip = clip
+        x_min, x_max = x_limits
+        y_min, y_max = y_limits
+        self.x_min = x_min
+        self.y_max = y_max
+        self.left = axes_left * width
+        self.top = (1.0 - axes_top) * height
+        self.x_scale = (axes_right - axes_left) * width / (x_max - x_min)
+        self.y_scale = (axes_top - axes_bottom) * height / (y_max - y_min)
+
+    def x(self, x):
+        return self.left + (x - self.x_min) * self.x_scale
+
+    def y(self, y):
+        return self.top + (self.y_max - y) * self.y_scale
+
+
+class SvgCanvas(Canvas):
+    color = staticmethod(color)
+
+    def __init__(self, height, x_limits, y_limits, clip=False):
+        super(SvgCanvas, self).__init__(height, x_limits, y_limits, clip)
+        self.elements = []
+
+    def line(self, x1, y1, x2, y2, stroke, width, dasharray=None,
+             linecap='square'):
+        dash = '' if dasharray is None else \
+            ' stroke-dasharray="{}"'.format(dasharray)
+        self.elements.append(
+            '<line x1="{}" y1="{}" x2="{}" y2="{}" stroke="{}" '
+            'stroke-width="{}" stroke-linecap="{}"{}/>'.format(
+                fmt(self.x(x1)), fmt(self.y(y1)),
+                fmt(self.x(x2)), fmt(self.y(y2)),
+                stroke, width, linecap, dash))
+
+    def circle(self, x, y, radius, fill, stroke, width):
+        self.elements.append(
+            '<circle cx="{}" cy="{}" r="{}" fill="{}" stroke="{}" '
+            'stroke-width="{}"/>'.format(
+                fmt(self.x(x)), fmt(self.y(y)), fmt(radius),
+                fill, stroke, width))
+
+    def polygon(self, x, y, points, fill, stroke, width):
+        cx, cy = self.x(x), self.y(y)
+        self.elements.append(
+            '<polygon points="{}" fill="{}" stroke="{}" '
+            'stroke-width="{}"/>'.format(
+                ' '.join(
+                    '{},{}'.format(fmt(cx + px), fmt(cy + py))
+                    for px, py in points),
+                fill, stroke, width))
+
+    def mark(self, x, y, segments, stroke, width):
+        cx, cy = self.x(x), self.y(y)
+        self.elements.append(
+            '<path d="{}" stroke="{}" stroke-width="{}"/>'.format(
+                ' '.join(
+                    'M{},{} L{},{}'.format(
+                        fmt(cx + x1), fmt(cy + y1),
+                        fmt(cx + x2), fmt(cy + y2))
+                    for (x1, y1), (x2, y2) in segments),
+                stroke, width))
+
+    def rect(self, x, y, w, h, fill, stroke, width):
+        self.elements.append(
+            '<rect x="{}" y="{}" width="{}" height="{}" fill="{}" '
+            'stroke="{}" stroke-width="{}"/>'.format(
+                fmt(self.x(x)), fmt(self.y(y + h)),
+                fmt(w * self.x_scale), fmt(h * self.y_scale),
+                fill, stroke, width))
+
+    def text(self, x, y, text):
+        self.elements.append(
+            '<text x="{}" y="{}" text-anchor="middle" '
+            'dominant-baseline="central">{}</text>'.format(
+                fmt(self.x(x)), fmt(self.y(y)), escape(text)))
+
+    def to_string(self):
+        elements = self.elements
+        if self.clip:
+            # the elements outside of the horizontal limits are hidden
+            elements = [
+                '<clipPath id="axes"><rect x="{}" y="0" width="{}" '
+                'height="100%"/></clipPath>'.format(
+                    fmt(self.left),
+                    fmt((axes_right - axes_left) * width)),
+                '<g clip-path="url(#axes)">',
+            ] + elements + ['</g>']
+        return '\n'.join([
+            '<?xml version="1.0" encoding="utf-8"?>',
+            '<svg xmlns="http://www.w3.org/2000/svg" version="1.1" '
+            'width="{0}pt" height="{1}pt" viewBox="0 0 {0} {1}">'.format(
+                fmt(width), fmt(self.height)),
+            '<g font-family="{}" font-size="{}">'.format(
+                'DejaVu Sans, Bitstream Vera Sans, sans-serif',
+                fmt(font_size)),
+            '<rect width="100%" height="100%" fill="#ffffff"/>',
+        ] + elements + ['</g>', '</svg>', ''])
+
+
+def create_canvas(canvas_class, layout, x_limits=None, **kwargs):
+    """Returns a canvas_class canvas fitting layout. With x_limits, the
+    horizontal axis is fixed to these (start, end) positions instead of
+    fitting the diagram, and the elements outside of them are clipped.
+    """
+    return canvas_class(
+        layout.height * 72, x_limits or layout.x_limits, layout.y_limits,
+        clip=x_limits is not None, **kwargs)
+
+
+def draw(canvas, layout, theme):
+    """Draws layout on canvas, texts last."""
+    color = canvas.color
+    timeline_color = color(theme.timeline_color)
+    emission_color = color(theme.emission_color)
+
+    # higher observable links
+    c = layout.higher_order_links
+    for i in range(0, len(c), 4):
+        canvas.line(c[i], c[i + 1], c[i + 2], c[i + 3], timeline_color, 2)
+
+    # emission links
+    c = layout.emission_links
+    for i in range(0, len(c), 4):
+        canvas.line(
+            c[i], c[i + 1], c[i + 2], c[i + 3],
+            emission_color, 1, dasharray='1,1.65', linecap='butt')
+
+    # time lines
+    c = layout.timelines
+    for i in range(0, len(c), 4):
+        canvas.line(c[i], c[i + 1], c[i + 2], c[i + 3], timeline_color, 2)
+
+    # emission arrows
+    half = arrow_size / 2
+    c = layout.arrows
+    for i in range(0, len(c), 2):
+        canvas.polygon(
+            c[i], c[i + 1], [(-half, -half), (half, -half), (0, half)],
+            emission_color, emission_color, 1)
+
+    half = end_size / 2
+    item_index = 0
+    aggregate_index = 0
+    label_index = 0
+    for index, layer_index in enumerate(layout.timeline_layers):
+        # end marker
+        x, y = layout.ends[2 * index], layout.ends[2 * index + 1]
+        kind = layout.end_kinds[index]
+        if kind == layouts.END_COMPLETED:
+            canvas.mark(x, y, [((0, -half), (0, half))], timeline_color, 2)
+        elif kind == layouts.END_ERROR:
+            canvas.mark(
+                x, y,
+                [((-half, -half), (half, half)),
+                 ((-half, half), (half, -half))],
+                timeline_color, 2)
+        else:
+            canvas.polygon(
+                x, y, [(-half, -half), (half, 0), (-half, half)],
+                timeline_color, timeline_color, 1)
+
+        # items
+        while item_index < len(layout.item_layers) \
+                and layout.item_layers[item_index] == layer_index:
+            canvas.circle(
+                layout.items[2 * item_index],
+                layout.items[2 * item_index + 1], item_radius,
+                color(theme.item_color), timeline_color, 2)
+            item_index += 1
+        while aggregate_index < len(layout.aggregate_layers) \
+                and layout.aggregate_layers[aggregate_index] == layer_index:
+            canvas.rect(
+                *layout.aggregates[4 * aggregate_index:
+                                   4 * aggregate_index + 4],
+                fill=color(theme.item_color), stroke=timeline_color,
+                width=2)
+            aggregate_index += 1
+
+        # label
+        if label_index < len(layout.label_layers) \
+                and layout.label_layers[label_index] == layer_index:
+            canvas.circle(
+                layout.labels[2 * label_index],
+                layout.labels[2 * label_index + 1], item_radius,
+                color(theme.label_color), color(theme.operator_edge_color),
+                2)
+            label_index += 1
+
+    # operators
+    c = layout.operators
+    for i in range(0, len(c), 4):
+        canvas.rect(
+            c[i], c[i + 1], c[i + 2], c[i + 3],
+            color(theme.operator_color), color(theme.operator_edge_color), 2)
+
+    # texts
+    for x, y, text in layout.texts:
+        canvas.text(x, y, text)
+
+
+def render_to_string(diagram, theme, x_limits=None):
+    """Returns the SVG document of diagram, a marble or its layout. With
+    x_limits, the horizontal axis is fixed to these (start, end) positions
+    instead of fitting the diagram, and the elements outside of them are
+    clipped.
+    """
+    layout = layouts.as_layout(diagram)
+    canvas = create_canvas(SvgCanvas, layout, x_limits)
+    draw(canvas, layout, theme)
+    return canvas.to_string()
+
+
+def render_to_file(diagram, filename, theme, x_limits=None):
+    with open(filename, 'w', encoding='utf-8') as svg_file:
+        svg_file.write(render_to_string(diagram, theme, x_limits=x_limits))
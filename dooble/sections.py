@@ -0,0 +1,93 @@
+"""Files of several marble diagram definitions.
+
+Each definition is a section, starting with a delimiter line of at least
+three '=' characters followed by the name of the section:
+
+    === map
+    --1--2--3-->
+    [ map(i: i*2) ]
+    --2--4--6-->
+    === filter
+    --1--2--3-->
+    [ filter(i: i > 1) ]
+    -----2--3-->
+
+Lines before the first delimiter are a section named after its index.
+Sections are read one at a time, so that each diagram can be rendered as
+soon as its definition is read.
+"""
+import os
+import re
+from collections import namedtuple
+from dooble.batch import Worker
+
+Section = namedtuple('Section', ['name', 'index', 'text'])
+
+delimiter_re = re.compile(r'={3,}(.*)$')
+name_re = re.compile(r'[a-zA-Z0-9_.\-]+$')
+
+
+def read_sections(lines):
+    """Yields a Section for each definition of lines, numbered from 1.
+
+    lines can be a file object, or any iterable of strings. Sections without
+    any definition are skipped.
+    """
+    names = set()
+    name = None
+    index = 0
+    text = []
+
+    def section():
+        section_name = str(index) if name is None else name
+        if section_name in names:
+            raise ValueError('duplicate section: {}'.format(section_name))
+        names.add(section_name)
+        return Section(section_name, index, ''.join(text))
+
+    for line_number, line in enumerate(lines, 1):
+        match = delimiter_re.match(line.rstrip('\r\n'))
+        if match is None:
+            text.append(line if line.endswith('\n') else line + '\n')
+            continue
+
+        if ''.join(text).strip():
+            index += 1
+            yield section()
+        name = match.group(1).strip() or None
+        if name is not None and (name_re.match(name) is None or name == '..'):
+            raise ValueError('invalid section name at line {}: {}'.format(
+                line_number, name))
+        text = []
+
+    if ''.join(text).strip():
+        index += 1
+        yield section()
+
+
+def is_template(output):
+    return '{name}' in output or '{index}' in output
+
+
+def output_path(template, section):
+    """Returns the path of the diagram of section, where {name} and {index}
+    in template are replaced with the name and the index of the section.
+    """
+    return template.replace('{name}', section.name).replace(
+        '{index}', str(section.index))
+
+
+def render_sections(sections, template, theme, cache=None, profiler=None,
+                    backend='matplotlib'):
+    """Renders each section to the path given by template, with backend.
+
+    The same parser and figure are used for all the sections. A Result is
+    yielded for each section as soon as it is rendered.
+    """
+    worker = Worker(cache, profiler, backend)
+    for section in sections:
+        output = output_path(template, section)
+        directory = os.path.dirname(output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        yield worker.render(section.name, section.text, output, theme)
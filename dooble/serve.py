@@ -0,0 +1,300 @@
+"""HTTP service rendering marble diagrams.
+
+Diagrams are rendered by a pool of worker processes, started once with
+matplotlib imported and a figure ready, so that a request only costs its
+rendering. The definition of a diagram is posted to /render, which returns
+the rendered image:
+
+    curl --data-binary @window.txt 'http://localhost:8000/render?format=svg'
+
+Requests are rejected with 503 once queue_size requests are waiting for a
+worker. /metrics returns the number of requests, the queue depth and the
+latencies as JSON.
+"""
+import json
+import multiprocessing
+import os
+import socketserver
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+from dooble.batch import create_marble, describe_error
+from dooble.dooble import default_theme
+from dooble.idl import Idl
+
+content_types = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'pdf': 'application/pdf',
+}
+
+max_body_size = 1024 * 1024
+min_dpi = 10
+max_dpi = 600
+
+
+class ServiceBusy(Exception):
+    pass
+
+
+class RenderError(Exception):
+    pass
+
+
+class RenderTimeout(RenderError):
+    pass
+
+
+class Renderer(object):
+    """Renders diagrams in a worker process, reusing the same figure."""
+
+    def __init__(self, theme):
+        from dooble.render import new_figure
+        self.idl = Idl(engine='fast')
+        self.theme = theme
+        self.fig = new_figure()
+
+    def __call__(self, text, fmt, dpi):
+        from dooble.render import render_to_bytes
+        try:
+            marble = create_marble(self.idl, text)
+            return render_to_bytes(
+                marble, self.theme, fmt=fmt, dpi=dpi,
+                fig=None if fmt == 'svg' else self.fig), None
+        except Exception as e:
+            return None, describe_error(e)
+
+
+_renderer = None
+
+
+def _init_renderer(theme):
+    global _renderer
+    import matplotlib
+    matplotlib.use('Agg')
+    _renderer = Renderer(theme)
+    # the first rendering loads fonts: it is done before the first request
+    _renderer('-a-|', 'png', 10)
+
+
+def _render(text, fmt, dpi):
+    return _renderer(text, fmt, dpi)
+
+
+class Metrics(object):
+    """Counters and latencies of the requests, shared between threads."""
+
+    def __init__(self, window=1024):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.rejected = 0
+        self.pending = 0
+        self.latencies = deque(maxlen=window)
+
+    def to_json(self, workers):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            metrics = {
+                'requests': self.requests,
+                'errors': self.errors,
+                'rejected': self.rejected,
+                'in_flight': self.pending,
+                'queue_depth': max(0, self.pending - workers),
+                'workers': workers,
+            }
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1,
+                                 int(p * len(latencies)))]
+
+        metrics['latency'] = {
+            'count': len(latencies),
+            'mean': sum(latencies) / len(latencies) if latencies else None,
+            'p50': percentile(0.5) if latencies else None,
+            'p90': percentile(0.9) if latencies else None,
+            'p99': percentile(0.99) if latencies else None,
+            'max': latencies[-1] if latencies else None,
+        }
+        return metrics
+
+
+class RenderService(object):
+    """Renders diagrams with a pool of workers processes.
+
+    At most workers + queue_size requests are accepted at the same time:
+    others are rejected with ServiceBusy. A request taking more than timeout
+    seconds fails with RenderTimeout, and an invalid one with RenderError.
+    A request that timed out still counts until its worker is done.
+    """
+
+    def __init__(self, workers=None, queue_size=16, timeout=30.0,
+                 theme=default_theme):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(self.workers + queue_size)
+        self.metrics = Metrics()
+        self.pool = multiprocessing.Pool(
+            self.workers, initializer=_init_renderer, initargs=(theme,))
+
+    def render(self, text, fmt='png', dpi=100):
+        if not self.slots.acquire(blocking=False):
+            with self.metrics.lock:
+                self.metrics.rejected += 1
+            raise ServiceBusy('{} requests in progress'.format(
+                self.metrics.pending))
+
+        start = time.perf_counter()
+        with self.metrics.lock:
+            self.metrics.requests += 1
+            self.metrics.pending += 1
+
+        def done(_):
+            # the slot is held until the worker is done, even if the request
+            # timed out, so that abandoned renderings are not queued forever
+            with self.metrics.lock:
+                self.metrics.pending -= 1
+            self.slots.release()
+
+        try:
+            result = self.pool.apply_async(
+                _render, (text, fmt, dpi), callback=done,
+                error_callback=done)
+        except Exception:
+            done(None)
+            raise
+        try:
+            data, error = result.get(self.timeout)
+        except multiprocessing.TimeoutError:
+            with self.metrics.lock:
+                self.metrics.errors += 1
+            raise RenderTimeout(
+                'rendering took more than {}s'.format(self.timeout))
+        finally:
+            with self.metrics.lock:
+                self.metrics.latencies.append(time.perf_counter() - start)
+
+        if error is not None:
+            with self.metrics.lock:
+                self.metrics.errors += 1
+            raise RenderError(error)
+        return data
+
+    def metrics_json(self):
+        return self.metrics.to_json(self.workers)
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    def send(self, status, content_type, body, headers=()):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_text(self, status, text, headers=()):
+        self.send(
+            status, 'text/plain; charset=utf-8',
+            (text + '\n').encode('utf-8'), headers)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/metrics':
+            self.send(
+                200, 'application/json',
+                json.dumps(self.server.service.metrics_json()).encode())
+        elif path == '/health':
+            self.send_text(200, 'ok')
+        else:
+            self.send_text(404, 'not found')
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/render':
+            self.send_text(404, 'not found')
+            return
+
+        query = parse_qs(url.query)
+        fmt = query.get('format', ['png'])[0]
+        if fmt not in content_types:
+            self.send_text(400, 'unsupported format: {}'.format(fmt))
+            return
+        try:
+            dpi = int(query.get('dpi', ['100'])[0])
+            length = int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            self.send_text(400, 'invalid dpi or Content-Length')
+            return
+        if not min_dpi <= dpi <= max_dpi:
+            self.send_text(400, 'dpi must be between {} and {}'.format(
+                min_dpi, max_dpi))
+            return
+        if length < 0:
+            self.send_text(400, 'invalid Content-Length')
+            return
+        if length > max_body_size:
+            self.send_text(413, 'definition too large')
+            return
+
+        try:
+            text = self.rfile.read(length).decode('utf-8')
+            data = self.server.service.render(text, fmt=fmt, dpi=dpi)
+        except ServiceBusy as e:
+            self.send_text(503, str(e), [('Retry-After', '1')])
+        except RenderTimeout as e:
+            self.send_text(504, str(e))
+        except (RenderError, UnicodeDecodeError) as e:
+            self.send_text(400, str(e))
+        else:
+            self.send(200, content_types[fmt], data)
+
+    def address_string(self):
+        # clients of a Unix socket have no address
+        if isinstance(self.client_address, tuple):
+            return super(RequestHandler, self).address_string()
+        return 'unix'
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn,
+                              socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def create_server(service, host='127.0.0.1', port=8000, socket_path=None):
+    """Returns an HTTP server of service, listening on socket_path if set,
+    or on host and port otherwise.
+    """
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = ThreadingUnixHTTPServer(socket_path, RequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), RequestHandler)
+    server.service = service
+    return server
+
+
+def serve(host='127.0.0.1', port=8000, socket_path=None, workers=None,
+          queue_size=16, timeout=30.0, theme=default_theme):
+    service = RenderService(
+        workers=workers, queue_size=queue_size, timeout=timeout, theme=theme)
+    server = create_server(service, host, port, socket_path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.close()
+        if socket_path is not None and os.path.exists(socket_path):
+            os.remove(socket_path)
@@ -0,0 +1,171 @@
+"""Rendering of long marble diagrams on several pages.
+
+The time axis of the diagram is split in tiles of a fixed width, each one
+rendered with the size of a whole diagram. The elements of each tile are
+found with an index of the positions of the items and links of the marble,
+so that the cost of rendering a tile does not depend on the length of the
+diagram.
+"""
+import math
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+from dooble.marble import Marble, Observable, Operator, ItemList, LinkList
+from dooble.lod import extent, sorted_items, copy_item
+from dooble import render_svg
+
+# part of the tile width by which tiles are extended on each side, so that
+# the items and end markers on the edges are drawn on both tiles
+overlap = 2 * render_svg.item_radius / (
+    (render_svg.axes_right - render_svg.axes_left) * render_svg.width)
+
+
+def sorted_links(links, key):
+    """Returns links sorted by key, called with the (from_x, from_y, to_x,
+    to_y) coordinates of each link.
+    """
+    coordinates = links.coordinates
+    order = sorted(
+        range(len(links)),
+        key=lambda index: key(coordinates[index * 4:index * 4 + 4]))
+    result = LinkList()
+    for index in order:
+        result.coordinates.extend(coordinates[index * 4:index * 4 + 4])
+    return result
+
+
+class TileIndex(object):
+    """Index of the items and links of a built marble by position.
+
+    Items and emission links are found by bisection on their position, and
+    higher order links by bisection on the lowest position of their ends.
+    """
+
+    def __init__(self, marble):
+        self.marble = marble
+        self.items = [
+            sorted_items(layer.items) if type(layer) is Observable else None
+            for layer in marble.layers
+        ]
+
+        # emission links are vertical: they are sorted by their position
+        self.emission_links = sorted_links(
+            marble.emission_links, lambda link: link[0])
+        self.emission_positions = array(
+            'd', self.emission_links.coordinates[::4])
+
+        # higher order links are sorted by their lowest position. A link
+        # ending after start begins at most higher_order_span before it
+        self.higher_order_links = sorted_links(
+            marble.higher_order_links, lambda link: min(link[0], link[2]))
+        coordinates = self.higher_order_links.coordinates
+        self.higher_order_lows = array(
+            'd', map(min, coordinates[0::4], coordinates[2::4]))
+        self.higher_order_highs = array(
+            'd', map(max, coordinates[0::4], coordinates[2::4]))
+        self.higher_order_span = max(
+            (high - low for low, high in zip(
+                self.higher_order_lows, self.higher_order_highs)),
+            default=0.0)
+
+    def extent(self):
+        return extent(self.marble)
+
+    def tile(self, start, end):
+        """Returns a marble of the elements between start and end.
+
+        Layers are kept, so that each tile has the same height, but are
+        clipped to start and end.
+        """
+        def clip(at):
+            return min(max(at, start), end)
+
+        marble = Marble(self.marble.vectorized)
+        for layer, items in zip(self.marble.layers, self.items):
+            if type(layer) is Operator:
+                marble.add_operator(
+                    Operator(clip(layer.start), clip(layer.end), layer.text))
+            elif type(layer) is Observable:
+                observable = Observable(
+                    clip(layer.start), is_child=layer.is_child)
+                observable.label = layer.label
+                observable.end = clip(layer.end)
+                if layer.completed is not None \
+                        and start <= layer.completed <= end:
+                    observable.completed = layer.completed
+                if layer.error is not None and start <= layer.error <= end:
+                    observable.error = layer.error
+
+                observable.items = ItemList()
+                low = bisect_left(items.positions, start)
+                high = bisect_right(items.positions, end, low)
+                for index in range(low, high):
+                    copy_item(items, index, observable.items)
+                marble.add_observable(observable)
+
+        low = bisect_left(self.emission_positions, start)
+        high = bisect_right(self.emission_positions, end, low)
+        marble.emission_links.coordinates.extend(
+            self.emission_links.coordinates[low * 4:high * 4])
+
+        coordinates = self.higher_order_links.coordinates
+        low = bisect_left(
+            self.higher_order_lows, start - self.higher_order_span)
+        high = bisect_right(self.higher_order_lows, end, low)
+        for index in range(low, high):
+            if self.higher_order_highs[index] >= start:
+                marble.higher_order_links.coordinates.extend(
+                    coordinates[index * 4:index * 4 + 4])
+        return marble
+
+
+def tiles(index, width):
+    """Yields the (start, end) limits of the tiles of index."""
+    start, end = index.extent()
+    margin = width * overlap
+    start, end = start - margin, end + margin
+    count = max(1, int(math.ceil((end - start) / width)))
+    for tile in range(count):
+        yield start + tile * width, start + (tile + 1) * width
+
+
+def tile_filename(filename, tile, count):
+    """Returns the name of the file of tile, numbered from 1."""
+    base, ext = os.path.splitext(filename)
+    return '{}-{:0{}d}{}'.format(base, tile + 1, len(str(count)), ext)
+
+
+def render_tiles(marble, filename, theme, width, fig=None):
+    """Renders marble in tiles of width positions.
+
+    The tiles are the pages of filename for a PDF file. Otherwise each tile
+    is rendered in its own file, numbered from filename. Returns the names
+    of the rendered files.
+    """
+    from dooble.render import new_figure, output_format, draw, \
+        render_to_file
+
+    index = TileIndex(marble)
+    limits = list(tiles(index, width))
+    margin = width * overlap
+
+    def tile_marbles():
+        for start, end in limits:
+            yield index.tile(start - margin, end + margin), (start, end)
+
+    if output_format(filename) == 'pdf':
+        from matplotlib.backends.backend_pdf import PdfPages
+        if fig is None:
+            fig = new_figure()
+        with PdfPages(filename) as pdf:
+            for tile, x_limits in tile_marbles():
+                draw(fig, tile, theme, x_limits=x_limits)
+                pdf.savefig(fig)
+        return [filename]
+
+    filenames = []
+    for number, (tile, x_limits) in enumerate(tile_marbles()):
+        tile_file = tile_filename(filename, number, len(limits))
+        render_to_file(tile, tile_file, theme, fig=fig, x_limits=x_limits)
+        filenames.append(tile_file)
+    return filenames
@@ -0,0 +1,91 @@
+import glob
+import os
+import sys
+import time
+from dooble.batch import Worker, output_file
+
+
+class Watcher(object):
+    """Tracks the changes of the marble files of a directory.
+
+    Files are polled: a file is reported once it did not change for debounce
+    seconds, so that a burst of saves triggers a single rendering.
+    """
+
+    def __init__(self, directory, pattern='*.txt', debounce=0.2):
+        self.directory = directory
+        self.pattern = pattern
+        self.debounce = debounce
+        self.pending = {}
+        self.snapshot = self.scan()
+
+    def files(self):
+        return sorted(glob.glob(os.path.join(self.directory, self.pattern)))
+
+    def scan(self):
+        snapshot = {}
+        for path in self.files():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def poll(self, now):
+        """Returns the files changed since they were last reported."""
+        snapshot = self.scan()
+        for path, stat in snapshot.items():
+            if self.snapshot.get(path) != stat:
+                self.pending[path] = now
+        for path in list(self.pending):
+            if path not in snapshot:
+                del self.pending[path]
+        self.snapshot = snapshot
+
+        ready = sorted(
+            path for path, changed in self.pending.items()
+            if now - changed >= self.debounce)
+        for path in ready:
+            del self.pending[path]
+        return ready
+
+
+def is_stale(input_file, output):
+    try:
+        return os.path.getmtime(output) < os.path.getmtime(input_file)
+    except FileNotFoundError:
+        return True
+
+
+def watch(directory, output_dir, fmt, theme, interval=0.5, debounce=0.2,
+          cache=None, stop=None):
+    """Renders the marble files of directory each time they change.
+
+    Outputs older than their definition are rendered first. The same parser
+    and figure are then used for all the renderings, until stop returns True
+    (forever by default).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    watcher = Watcher(directory, debounce=debounce)
+    worker = Worker(cache)
+
+    def render(input_file):
+        output = output_file(input_file, output_dir, fmt)
+        result = worker((input_file, output, theme))
+        if result.error is not None:
+            print('{}: {}'.format(input_file, result.error), file=sys.stderr)
+        else:
+            print('{} -> {}'.format(input_file, output), file=sys.stderr)
+        return result
+
+    # load matplotlib before the first change rather than on it
+    worker.figure(output_file('marble', output_dir, fmt))
+    for input_file in watcher.files():
+        if is_stale(input_file, output_file(input_file, output_dir, fmt)):
+            render(input_file)
+
+    while stop is None or not stop():
+        for input_file in watcher.poll(time.monotonic()):
+            render(input_file)
+        time.sleep(min(interval, debounce) if watcher.pending else interval)
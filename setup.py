@@ -16,6 +16,10 @@ requirements = [
     'matplotlib>=2.2'
 ]
 
+extras_requirements = {
+    'raster': ['Pillow>=9.2'],
+}
+
 setup_requirements = [ ]
 
 test_requirements = [ ]
@@ -32,6 +36,7 @@ setup(
     ],
     description="A marble diagram generator",
     install_requires=requirements,
+    extras_require=extras_requirements,
     license="MIT license",
     long_description=readme + '\n\n' + history,
     include_package_data=True,
@@ -0,0 +1,133 @@
+import asyncio
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from dooble import aio
+from dooble.dooble import default_theme
+from dooble.render import render_to_bytes
+
+
+examples = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+
+def load_text(name):
+    with open(os.path.join(examples, name + '.txt')) as idl_file:
+        return idl_file.read()
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    def __init__(self, *args, **kwargs):
+        super(CountingExecutor, self).__init__(*args, **kwargs)
+        self.submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super(CountingExecutor, self).submit(*args, **kwargs)
+
+
+class TestAio(unittest.TestCase):
+    def test_parse_render(self):
+        async def main():
+            marble = await aio.parse(load_text('window'))
+            return marble, await aio.render(marble, fmt='svg')
+
+        marble, svg = asyncio.run(main())
+        self.assertEqual(5, len(marble.layers))
+        self.assertEqual(
+            render_to_bytes(marble, default_theme, fmt='svg'), svg)
+
+    def test_render_many(self):
+        names = ['map', 'window', 'catch']
+
+        async def main(renderer):
+            marbles = [await renderer.parse(load_text(n)) for n in names]
+            return marbles, await renderer.render_many(marbles)
+
+        for executor in [ThreadPoolExecutor(2), ProcessPoolExecutor(2)]:
+            with executor:
+                renderer = aio.Renderer(executor, max_concurrency=2)
+                marbles, images = asyncio.run(main(renderer))
+            self.assertEqual(
+                [render_to_bytes(m, default_theme) for m in marbles], images)
+
+    def test_errors(self):
+        async def main():
+            return await aio.render_many(
+                [None, await aio.parse('--a-|')], fmt='svg',
+                return_exceptions=True)
+
+        error, svg = asyncio.run(main())
+        self.assertIsInstance(error, Exception)
+        self.assertIn(b'<svg', svg)
+
+        with self.assertRaises(Exception):
+            asyncio.run(aio.parse('--a--'))
+
+    def test_concurrency_limit(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+            return 'done'
+
+        async def main(renderer):
+            first = asyncio.ensure_future(renderer.run(block))
+            second = asyncio.ensure_future(renderer.run(block))
+            third = asyncio.ensure_future(renderer.run(block, timeout=0.05))
+            while not started.is_set():
+                await asyncio.sleep(0.01)
+            second.cancel()
+            with self.assertRaises(asyncio.TimeoutError):
+                await third
+            release.set()
+            with self.assertRaises(asyncio.CancelledError):
+                await second
+            return await first
+
+        with CountingExecutor(4) as executor:
+            renderer = aio.Renderer(executor, max_concurrency=1)
+            self.assertEqual('done', asyncio.run(main(renderer)))
+            # the cancelled and timed out calls never reached the executor
+            self.assertEqual(1, executor.submitted)
+
+    def test_timeout_holds_slot(self):
+        release = threading.Event()
+
+        def block():
+            release.wait(5)
+            return 'done'
+
+        async def main(renderer):
+            with self.assertRaises(asyncio.TimeoutError):
+                await renderer.run(block, timeout=0.05)
+            # block is still running in the executor
+            with self.assertRaises(asyncio.TimeoutError):
+                await renderer.run(lambda: 'next', timeout=0.05)
+            release.set()
+            return await renderer.run(lambda: 'next', timeout=5)
+
+        with CountingExecutor(4) as executor:
+            renderer = aio.Renderer(executor, max_concurrency=1)
+            self.assertEqual('next', asyncio.run(main(renderer)))
+            self.assertEqual(2, executor.submitted)
+
+    def test_render_text_timeout(self):
+        def slow(*args):
+            time.sleep(0.2)
+
+        async def main(renderer):
+            return await renderer.render_text('-a-|', timeout=0.3)
+
+        with ThreadPoolExecutor(2) as executor, \
+                mock.patch.object(aio, '_parse', slow), \
+                mock.patch.object(aio, '_render', slow):
+            renderer = aio.Renderer(executor, max_concurrency=2)
+            # each step is within the timeout, but not both
+            with self.assertRaises(asyncio.TimeoutError):
+                asyncio.run(main(renderer))
@@ -0,0 +1,50 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from dooble.batch import render_files
+from dooble.dooble import default_theme
+
+
+examples = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.inputs = [
+            os.path.join(examples, n + '.txt')
+            for n in ['map', 'window', 'catch']
+        ]
+        invalid = os.path.join(self.tmpdir, 'invalid.txt')
+        with open(invalid, 'w') as f:
+            f.write('--a--b-\n')
+        self.inputs.insert(1, invalid)
+        self.outputs = [
+            os.path.join(self.tmpdir, '{}.png'.format(i))
+            for i in range(len(self.inputs))
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def check_results(self, results):
+        self.assertEqual(len(self.inputs), len(results))
+        for result in results:
+            if result.input.endswith('invalid.txt'):
+                self.assertIn('ParseError', result.error)
+                self.assertFalse(os.path.exists(result.output))
+            else:
+                self.assertIsNone(result.error)
+                self.assertTrue(os.path.exists(result.output))
+
+    def test_render_files(self):
+        results = list(render_files(self.inputs, self.outputs, default_theme))
+        self.assertEqual(self.inputs, [r.input for r in results])
+        self.check_results(results)
+
+    def test_render_files_parallel(self):
+        results = list(render_files(
+            self.inputs, self.outputs, default_theme, jobs=2))
+        self.check_results(results)
@@ -0,0 +1,78 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from dooble.idl import Idl
+from dooble.dooble import create_marble_from_ast
+from benchmarks.generate import generate
+from benchmarks.run import main, measure
+from tests.test_idl_fast import plain_ast
+
+
+class TestGenerate(unittest.TestCase):
+    def test_generate(self):
+        text = generate(sections=2, layers=3, items=20, childs=4, seed=1)
+        ast = Idl(engine='fast').parse(text)
+        self.assertEqual(plain_ast(Idl().parse(text)), ast)
+
+        marble = create_marble_from_ast(ast)
+        self.assertEqual(2 * (3 + 4 + 2), len(marble.layers))
+        self.assertEqual(2 * 4, len(marble.higher_order_links))
+        for link in marble.higher_order_links:
+            self.assertEqual(link.from_x, link.to_x)
+
+    def test_seed(self):
+        self.assertEqual(generate(seed=3), generate(seed=3))
+        self.assertNotEqual(generate(seed=3), generate(seed=4))
+
+
+class TestRun(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_measure(self):
+        marbles = []
+
+        def setup():
+            marbles.append(create_marble_from_ast(
+                Idl(engine='fast').parse('-a-|'), build=False))
+            return marbles[-1]
+
+        stats, result = measure(lambda m: m, 3, setup=setup)
+        self.assertEqual(3, len(marbles))
+        self.assertIs(marbles[-1], result)
+        self.assertLessEqual(stats['min'], stats['max'])
+
+    def test_main(self):
+        filename = os.path.join(self.tmpdir, 'results.json')
+        main([
+            '--items', '2', '5', '--repeat', '1', '--format', 'svg',
+            '--output', filename])
+        with open(filename) as results_file:
+            report = json.load(results_file)
+
+        self.assertEqual('svg', report['format'])
+        self.assertEqual(
+            [2, 5], [r['size']['items'] for r in report['results']])
+        for result in report['results']:
+            self.assertEqual(
+                {'parse', 'create_marble_from_ast', 'build',
+                 'render_to_file'},
+                set(result['stages']))
+
+    def test_backend(self):
+        filename = os.path.join(self.tmpdir, 'results.json')
+        main([
+            '--items', '2', '--repeat', '1', '--backend', 'raster',
+            '--output', filename])
+        with open(filename) as results_file:
+            report = json.load(results_file)
+
+        self.assertEqual('raster', report['backend'])
+        self.assertEqual('png', report['format'])
+        self.assertIsNotNone(report['environment']['pillow'])
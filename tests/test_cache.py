@@ -0,0 +1,117 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from dooble.batch import render_files
+from dooble.cache import RenderCache, cache_key
+from dooble.dooble import default_theme
+
+
+examples = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+
+def write(filename, content):
+    with open(filename, 'w') as f:
+        f.write(content)
+
+
+def read(filename):
+    with open(filename) as f:
+        return f.read()
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmpdir, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_key(self):
+        key = cache_key('-a->', default_theme, 'png', 100)
+        self.assertEqual(key, cache_key('-a->', default_theme, 'png', 100))
+        self.assertNotEqual(key, cache_key('-b->', default_theme, 'png', 100))
+        self.assertNotEqual(key, cache_key('-a->', default_theme, 'svg', 100))
+        self.assertNotEqual(key, cache_key('-a->', default_theme, 'png', 200))
+        self.assertNotEqual(
+            key, cache_key('-a->', default_theme, 'png', 100, 'raster'))
+        theme = default_theme._replace(item_color=(0.0, 0.0, 0.0))
+        self.assertNotEqual(key, cache_key('-a->', theme, 'png', 100))
+
+    def test_fetch(self):
+        cache = RenderCache(self.cache_dir)
+        output = os.path.join(self.tmpdir, 'out.svg')
+        self.assertFalse(cache.fetch('ab12', 'svg', output))
+
+        write(output, 'diagram')
+        cache.store('ab12', 'svg', output)
+        os.remove(output)
+        self.assertTrue(cache.fetch('ab12', 'svg', output))
+        self.assertEqual('diagram', read(output))
+
+    def test_copy(self):
+        cache = RenderCache(self.cache_dir)
+        output = os.path.join(self.tmpdir, 'out.svg')
+        write(output, 'diagram')
+        cache.store('ab12', 'svg', output)
+        self.assertTrue(cache.fetch('ab12', 'svg', output))
+
+        # rendering to the output without the cache leaves the entry intact
+        write(output, 'other diagram')
+        self.assertEqual('diagram', read(cache.path('ab12', 'svg')))
+
+    def test_link(self):
+        cache = RenderCache(self.cache_dir, link=True)
+        output = os.path.join(self.tmpdir, 'out.svg')
+        write(output, 'diagram')
+        cache.store('ab12', 'svg', output)
+        self.assertTrue(cache.fetch('ab12', 'svg', output))
+        self.assertEqual(2, os.stat(output).st_nlink)
+        self.assertEqual(0, os.stat(output).st_mode & 0o222)
+
+        # a miss must not let the linked entry be overwritten
+        self.assertFalse(cache.fetch('cd34', 'svg', output))
+        self.assertFalse(os.path.exists(output))
+        self.assertEqual('diagram', read(cache.path('ab12', 'svg')))
+
+    def test_evict(self):
+        cache = RenderCache(self.cache_dir, max_size=25)
+        output = os.path.join(self.tmpdir, 'out.svg')
+        write(output, '0123456789')
+        past = time.time() - 100
+        for index, key in enumerate(['aa', 'bb']):
+            cache.store(key, 'svg', output)
+            os.utime(cache.path(key, 'svg'), (past + index, past + index))
+
+        # bb is the least recently used entry once aa is fetched
+        self.assertTrue(cache.fetch('aa', 'svg', output))
+        cache.store('cc', 'svg', output)
+        self.assertTrue(os.path.exists(cache.path('aa', 'svg')))
+        self.assertFalse(os.path.exists(cache.path('bb', 'svg')))
+        self.assertTrue(os.path.exists(cache.path('cc', 'svg')))
+        self.assertEqual(20, cache.size)
+
+    def test_render_files(self):
+        cache = RenderCache(self.cache_dir)
+        inputs = [
+            os.path.join(examples, n + '.txt') for n in ['map', 'window']
+        ]
+        outputs = [
+            os.path.join(self.tmpdir, n + '.svg') for n in ['map', 'window']
+        ]
+
+        results = list(
+            render_files(inputs, outputs, default_theme, cache=cache))
+        self.assertEqual([False, False], [r.cached for r in results])
+        expected = [read(o) for o in outputs]
+        for output in outputs:
+            os.remove(output)
+
+        results = list(
+            render_files(inputs, outputs, default_theme, cache=cache))
+        self.assertEqual([None, None], [r.error for r in results])
+        self.assertEqual([True, True], [r.cached for r in results])
+        self.assertEqual(expected, [read(o) for o in outputs])
@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+from dooble.idl import Idl
+from tests.test_idl_fast import plain_ast
+
+
+text = '''--a-b-c---d-e-f-->
+[     window     ]
+--+-------+------>
+          +d-e-f-|
+  +a-b-c-|
+'''
+
+
+def lifetime(text):
+    return [{'ts': '-', 'item': None} if c == '-' else {'ts': None, 'item': c}
+            for c in text]
+
+
+expected_result = [
+    {'obs': [[], lifetime('--a-b-c---d-e-f--'), '>'], 'op': None},
+    {'obs': None, 'op': ['[', '     window     ', ']']},
+    {'obs': [[], lifetime('--+-------+------'), '>'], 'op': None},
+    {'obs': [[' '] * 10, '+', lifetime('d-e-f-'), '|'], 'op': None},
+    {'obs': [[' '] * 2, '+', lifetime('a-b-c-'), '|'], 'op': None},
+]
+
+
+def cold_compile_time():
+    """Returns the duration of the compilation of the grammar in a new
+    interpreter, where it is not memoized yet.
+    """
+    output = subprocess.check_output([
+        sys.executable, '-c',
+        'import time, tatsu; from dooble.idl import grammar; '
+        'start = time.perf_counter(); tatsu.compile(grammar); '
+        'print(time.perf_counter() - start)'],
+        cwd=os.path.join(os.path.dirname(__file__), '..'))
+    return float(output)
+
+
+def timeit(func, count=1):
+    start = time.perf_counter()
+    for _ in range(count):
+        result = func()
+    return (time.perf_counter() - start) / count, result
+
+
+class TestIdlBenchmark(unittest.TestCase):
+    def test_cold_start(self):
+        compile_time = cold_compile_time()
+        Idl()
+        cached_time, _ = timeit(Idl, count=100)
+        generated_time, _ = timeit(lambda: Idl(engine='generated'), count=100)
+        print('\ncold start: compile {:.6f}s, cached {:.6f}s, '
+              'generated {:.6f}s'.format(
+                  compile_time, cached_time, generated_time))
+
+        self.assertLess(cached_time, compile_time)
+        self.assertLess(generated_time, compile_time)
+
+    def test_parse(self):
+        for engine in ['tatsu', 'generated', 'fast']:
+            idl = Idl(engine=engine)
+            parse_time, ast = timeit(lambda: idl.parse(text), count=20)
+            print('\nparse ({}): {:.6f}s'.format(engine, parse_time))
+            self.assertEqual(plain_ast(expected_result), plain_ast(ast))
+
+    def test_shared_model(self):
+        self.assertIs(Idl().model, Idl().model)
@@ -0,0 +1,125 @@
+import glob
+import os
+import random
+import threading
+import unittest
+
+from dooble.idl import Idl
+from dooble.idl_fast import ParseError
+
+
+examples = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+
+def plain_ast(ast):
+    """Returns ast as plain dicts and lists with all the keys of its rules,
+    as returned by the fast parser: depending on its version, TatSu omits
+    the names of the alternatives that did not match.
+    """
+    if isinstance(ast, dict):
+        ast = {key: plain_ast(value) for key, value in ast.items()}
+        for names in [('obs', 'op'), ('ts', 'item')]:
+            if any(name in ast for name in names):
+                for name in names:
+                    ast.setdefault(name, None)
+        return ast
+    if isinstance(ast, (list, tuple)):
+        return [plain_ast(value) for value in ast]
+    return ast
+
+
+def random_observable(rnd):
+    text = ' ' * rnd.randint(0, 3)
+    text += rnd.choice(['', '', '+', 'a', 'z'])
+    for _ in range(rnd.randint(0, 12)):
+        text += rnd.choice(['-', '-', '-', 'a', 'b1', '+', '7.5', 'x,y'])
+    text += rnd.choice('>|*')
+    return text
+
+
+def random_operator(rnd):
+    return '[' + ''.join(
+        rnd.choice('ab (i: i*2) <>_,+') for _ in range(rnd.randint(1, 20))
+    ) + ']'
+
+
+def random_valid_text(rnd):
+    layers = []
+    for _ in range(rnd.randint(0, 6)):
+        if rnd.random() < 0.3:
+            layers.append(random_operator(rnd))
+        else:
+            layers.append(random_observable(rnd))
+    return rnd.choice(['\n', '\n\n', '']).join(layers) + rnd.choice(['', '\n'])
+
+
+def random_text(rnd):
+    return ''.join(
+        rnd.choice(' -+ab1|>*[]():\n\t.')
+        for _ in range(rnd.randint(0, 20)))
+
+
+class TestIdlFast(unittest.TestCase):
+    def setUp(self):
+        self.reference = Idl(engine='tatsu')
+        self.idl = Idl(engine='fast')
+
+    def assertSameParse(self, text):
+        try:
+            expected_result = plain_ast(self.reference.parse(text))
+        except Exception:
+            with self.assertRaises(ParseError, msg=repr(text)):
+                self.idl.parse(text)
+        else:
+            self.assertEqual(
+                expected_result, self.idl.parse(text), msg=repr(text))
+
+    def test_examples(self):
+        files = glob.glob(os.path.join(examples, '*.txt'))
+        self.assertNotEqual([], files)
+        for filename in files:
+            with open(filename) as idl_file:
+                self.assertSameParse(idl_file.read())
+
+    def test_random_valid(self):
+        rnd = random.Random(42)
+        for _ in range(300):
+            self.assertSameParse(random_valid_text(rnd))
+
+    def test_random(self):
+        rnd = random.Random(42)
+        for _ in range(300):
+            self.assertSameParse(random_text(rnd))
+
+    def test_plain_ast(self):
+        self.assertEqual(
+            [{'obs': [[], [{'ts': '-', 'item': None},
+                           {'ts': None, 'item': 'a'}], '>'], 'op': None}],
+            plain_ast(({'obs': ((), ({'ts': '-'}, {'item': 'a'}), '>')},)))
+
+    def test_threads(self):
+        rnd = random.Random(42)
+        texts = [random_valid_text(rnd) for _ in range(8)]
+        expected = [self.idl.parse(text) for text in texts]
+        results = {}
+
+        def parse(index):
+            for _ in range(200):
+                result = self.idl.parse(texts[index])
+                if result != expected[index]:
+                    break
+            results[index] = result
+
+        threads = [threading.Thread(target=parse, args=(index,))
+                   for index in range(len(texts))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(expected, [results[i] for i in range(len(texts))])
+
+    def test_error_location(self):
+        with self.assertRaises(ParseError) as cm:
+            self.idl.parse('-a->\n-b-')
+        self.assertEqual(2, cm.exception.line)
+        self.assertEqual(4, cm.exception.col)
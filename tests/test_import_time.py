@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+import unittest
+
+
+root = os.path.join(os.path.dirname(__file__), '..')
+heavy_modules = ['matplotlib', 'numpy', 'tatsu']
+
+# Budget of the cumulative import time of a module, in microseconds
+budget = 100000
+
+
+def import_times(statement):
+    """Returns the cumulative import time of each module imported by
+    statement, as reported by python -X importtime.
+    """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, cwd=root, check=True)
+
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if not fields[0].strip().isdigit():
+            continue
+        times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+@unittest.skipIf(sys.version_info < (3, 7), 'requires python -X importtime')
+class TestImportTime(unittest.TestCase):
+    def check(self, statement, module):
+        times = import_times(statement)
+        for heavy_module in heavy_modules:
+            self.assertNotIn(heavy_module, times, statement)
+        self.assertLess(times[module], budget, statement)
+
+    def test_dooble(self):
+        self.check('import dooble', 'dooble')
+
+    def test_idl(self):
+        self.check('import dooble.idl', 'dooble.idl')
+
+    def test_cli(self):
+        self.check('import dooble.cli', 'dooble.cli')
+
+    def test_help(self):
+        times = import_times(
+            'import sys; sys.argv = ["dooble", "--help"]\n'
+            'from dooble.cli import main\n'
+            'try:\n'
+            '    main()\n'
+            'except SystemExit:\n'
+            '    pass\n')
+        for heavy_module in heavy_modules:
+            self.assertNotIn(heavy_module, times)
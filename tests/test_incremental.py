@@ -0,0 +1,117 @@
+import random
+import time
+import unittest
+
+from dooble.dooble import create_marble_from_ast
+from dooble.idl import Idl
+from dooble.idl_fast import ParseError
+from dooble.incremental import IncrementalParser
+
+
+def random_line(rnd):
+    if rnd.random() < 0.2:
+        return '[ ' + rnd.choice(['map', 'merge', 'window']) + ' ]'
+    text = ' ' * rnd.randint(0, 6)
+    text += rnd.choice(['', '', '+', 'a'])
+    for _ in range(rnd.randint(0, 10)):
+        text += rnd.choice(['-', '-', 'a', 'b1', '+'])
+    return text + rnd.choice('>|*')
+
+
+class CountingIdl(Idl):
+    def __init__(self):
+        super(CountingIdl, self).__init__(engine='fast')
+        self.parsed = []
+
+    def parse(self, text):
+        self.parsed.append(text)
+        return super(CountingIdl, self).parse(text)
+
+
+class TestIncrementalParser(unittest.TestCase):
+    def setUp(self):
+        self.idl = Idl(engine='fast')
+
+    def check(self, parser, ast):
+        text = '\n'.join(parser.lines)
+        self.assertEqual(self.idl.parse(text), ast)
+        marble = parser.create_marble()
+        expected = create_marble_from_ast(self.idl.parse(text))
+        self.assertEqual(
+            expected.higher_order_links, marble.higher_order_links)
+        self.assertEqual(expected.emission_links, marble.emission_links)
+
+    def test_random_edits(self):
+        rnd = random.Random(42)
+        parser = IncrementalParser()
+        lines = [random_line(rnd) for _ in range(20)]
+        self.check(parser, parser.parse('\n'.join(lines)))
+        for _ in range(200):
+            start = rnd.randint(0, len(parser.lines))
+            end = min(len(parser.lines), start + rnd.randint(0, 2))
+            new_lines = [random_line(rnd) for _ in range(rnd.randint(0, 2))]
+            if rnd.random() < 0.5:
+                ast = parser.edit(start, end, new_lines)
+            else:
+                lines = list(parser.lines)
+                lines[start:end] = new_lines
+                ast = parser.parse('\n'.join(lines))
+            self.check(parser, ast)
+
+    def test_changed_lines_only(self):
+        idl = CountingIdl()
+        parser = IncrementalParser(idl)
+        parser.parse('--a--b-->\n[ map ]\n--c--d-->')
+        self.assertEqual(3, len(idl.parsed))
+        marble = parser.create_marble()
+
+        del idl.parsed[:]
+        parser.parse('--a--b-->\n[ map ]\n--c--e-->')
+        self.assertEqual(['--c--e-->'], idl.parsed)
+        next_marble = parser.create_marble()
+        self.assertIs(marble.layers[0], next_marble.layers[0])
+        self.assertIsNot(marble.layers[2], next_marble.layers[2])
+
+        del idl.parsed[:]
+        parser.edit(1, 2, ['[ filter ]', '--f-->'])
+        self.assertEqual(['[ filter ]', '--f-->'], idl.parsed)
+        self.assertEqual(4, len(parser.create_marble().layers))
+
+    def test_multiline_layers(self):
+        parser = IncrementalParser()
+        ast = parser.parse('--a--\n-->\n  \n-b-|')
+        self.check(parser, ast)
+        self.assertEqual(2, len(ast))
+        ast = parser.edit(0, 1, ['--a-->'])
+        self.check(parser, ast)
+        self.assertEqual(3, len(ast))
+
+    def test_error(self):
+        parser = IncrementalParser()
+        parser.parse('-a->\n-b->')
+        with self.assertRaises(ParseError) as cm:
+            parser.edit(1, 2, ['-b-'])
+        self.assertEqual(2, cm.exception.line)
+
+        ast = parser.edit(1, 2, ['-c->'])
+        self.check(parser, ast)
+
+    def test_latency(self):
+        rnd = random.Random(42)
+        lines = [random_line(rnd) for _ in range(2000)]
+        text = '\n'.join(lines)
+        parser = IncrementalParser()
+        parser.parse(text)
+        parser.create_marble()
+
+        start = time.perf_counter()
+        create_marble_from_ast(self.idl.parse(text))
+        full_duration = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parser.edit(1000, 1001, ['--x--y-->'])
+        parser.create_marble()
+        duration = time.perf_counter() - start
+        print('\nedit of 2000 lines: {:.6f}s (full parse: {:.6f}s)'.format(
+            duration, full_duration))
+        self.assertLess(duration, full_duration)
@@ -0,0 +1,58 @@
+import io
+import unittest
+
+from dooble.ingest import Event, read_events, read_marble
+from dooble.marble import Item, ObsItem, Link
+
+
+log = '''{"stream": "source", "ts": 100.0, "kind": "next", "value": "a"}
+{"stream": "windows", "ts": 100.5, "kind": "child", "value": "w1"}
+{"stream": "w1", "ts": 101.0, "kind": "next", "value": "a"}
+
+{"stream": "source", "ts": 102.0, "kind": "next", "value": "b"}
+{"stream": "w1", "ts": 103.0, "kind": "completed"}
+{"stream": "source", "ts": 104.0, "kind": "error"}
+'''
+
+
+class TestIngest(unittest.TestCase):
+    def test_read_events(self):
+        events = list(read_events(io.StringIO(log)))
+        self.assertEqual(6, len(events))
+        self.assertEqual(Event('w1', 103.0, 'completed', None), events[4])
+
+    def test_read_events_lazy(self):
+        def lines():
+            yield '{"stream": "s", "ts": 1, "kind": "next", "value": 1}'
+            raise AssertionError('read too far')
+
+        events = read_events(lines())
+        self.assertEqual(Event('s', 1.0, 'next', 1), next(events))
+
+    def test_invalid_event(self):
+        with self.assertRaises(ValueError) as cm:
+            list(read_events(['{"stream": "s", "ts": 1, "kind": "next"}',
+                              '{"stream": "s", "kind": "next"}']))
+        self.assertIn('line 2', str(cm.exception))
+
+        with self.assertRaises(ValueError):
+            list(read_events(['{"stream": "s", "ts": 1, "kind": "other"}']))
+
+    def test_read_marble(self):
+        marble = read_marble(io.StringIO(log), time_scale=2.0)
+
+        source, windows, w1 = marble.layers
+        self.assertEqual(0.0, source.start)
+        self.assertEqual([Item('a', 0.0), Item('b', 4.0)], list(source.items))
+        self.assertEqual(8.0, source.error)
+
+        self.assertEqual(1.0, windows.start)
+        self.assertEqual([ObsItem(1.0)], list(windows.items))
+        self.assertEqual(8.0, windows.end)
+        self.assertIsNone(windows.completed)
+
+        self.assertTrue(w1.is_child)
+        self.assertEqual(1.0, w1.start)
+        self.assertEqual(6.0, w1.completed)
+
+        self.assertEqual([Link(1.0, 1, 1.0, 2)], marble.higher_order_links)
@@ -0,0 +1,81 @@
+import json
+import pickle
+import unittest
+from unittest import mock
+
+from dooble import layout as layout_module
+from dooble.idl import Idl
+from dooble.dooble import create_marble_from_ast, default_theme
+from dooble.layout import Layout, create_layout, END_COMPLETED, END_ERROR
+from dooble.lod import downsample
+from dooble.render import render_to_bytes
+from dooble.render_svg import render_to_string
+
+
+def create_marble(text):
+    return create_marble_from_ast(Idl(engine='fast').parse(text))
+
+
+catch = '''--1--2--3--*
+         a-7-8-|
+[   catch(a)   ]
+--1--2--3--7-8-|
+'''
+
+
+class TestLayout(unittest.TestCase):
+    def test_primitives(self):
+        layout = create_layout(create_marble(catch))
+        self.assertEqual(4, layout.layer_count)
+        self.assertAlmostEqual(2.8, layout.height)
+        self.assertEqual([0, 1, 3], layout.timeline_layers.tolist())
+        self.assertEqual(
+            [END_ERROR, END_COMPLETED, END_COMPLETED], layout.end_kinds)
+        self.assertEqual(3 + 2 + 5, len(layout.item_layers))
+        self.assertEqual([1], layout.label_layers.tolist())
+        self.assertEqual([2], layout.operator_layers.tolist())
+        self.assertEqual(
+            len(layout.emission_links) // 2, len(layout.arrows))
+        self.assertIn((7.5, 1, 'catch(a)'), layout.texts)
+
+        # y is flipped, the first layer being at the top
+        self.assertEqual([2.0, 3.0], layout.items[:2].tolist())
+        self.assertEqual([0.0, 0.85, 15.0, 0.35],
+                         [round(c, 2) for c in layout.operators])
+
+    def test_aggregates(self):
+        marble = downsample(
+            create_marble('-' + 'a-' * 200 + '|'), buckets=10)
+        layout = create_layout(marble)
+        self.assertEqual(10, len(layout.aggregate_layers))
+        self.assertEqual(0, len(layout.item_layers))
+
+    def test_vectorized(self):
+        items = '-'.join('a' * 600)
+        marble = create_marble('+-' + items + '-->\n[ map ]\n-' + items + '>')
+        layout = create_layout(marble)
+        with mock.patch.object(layout_module, 'numpy_view',
+                               return_value=None):
+            expected = create_layout(marble)
+        self.assertEqual(1200, len(layout.arrows) // 2)
+        self.assertEqual(expected.to_json(), layout.to_json())
+
+    def test_themes(self):
+        marble = create_marble(catch)
+        layout = create_layout(marble)
+        theme = default_theme._replace(item_color=(1.0, 0.0, 0.0))
+        for t in [default_theme, theme]:
+            self.assertEqual(
+                render_to_string(marble, t), render_to_string(layout, t))
+            self.assertEqual(
+                render_to_bytes(marble, t), render_to_bytes(layout, t))
+
+    def test_serialization(self):
+        layout = create_layout(create_marble(catch))
+        expected = render_to_string(layout, default_theme)
+
+        copy = pickle.loads(pickle.dumps(layout))
+        self.assertEqual(expected, render_to_string(copy, default_theme))
+
+        copy = Layout.from_json(json.loads(json.dumps(layout.to_json())))
+        self.assertEqual(expected, render_to_string(copy, default_theme))
@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from dooble.dooble import default_theme
+from dooble.lod import downsample, default_buckets
+from dooble.marble import Marble, Observable, Operator, Item, ObsItem, \
+    Aggregate, Link
+from dooble.render import render_to_file
+
+
+def create_marble(count, step=1.0):
+    marble = Marble()
+    observable = Observable(0.0)
+    for index in range(count):
+        observable.on_next_at(index % 10, index * step)
+    observable.on_completed_at(count * step)
+    marble.add_observable(observable)
+    marble.add_operator(Operator(0.0, count * step, 'map(i: i)'))
+    marble.build()
+    return marble
+
+
+class TestDownsample(unittest.TestCase):
+    def test_aggregate(self):
+        marble = downsample(create_marble(1000), buckets=10)
+
+        items = list(marble.layers[0].items)
+        self.assertEqual(10, len(items))
+        self.assertEqual(Aggregate(100, 50.0, 100.0), items[0])
+        self.assertEqual(1000, sum(item.count for item in items))
+        self.assertEqual(1000.0, marble.layers[0].completed)
+        self.assertEqual(10, len(marble.emission_links))
+
+    def test_isolated_items(self):
+        marble = Marble()
+        observable = Observable(0.0)
+        observable.on_next_at('a', 1.0)
+        observable.on_next_at('b', 1.5)
+        observable.on_next_at('c', 8.0)
+        observable.on_completed_at(10.0)
+        marble.add_observable(observable)
+        marble.build()
+
+        items = list(downsample(marble, buckets=5).layers[0].items)
+        self.assertEqual([Aggregate(2, 1.0, 2.0), Item('c', 8.0)], items)
+
+    def test_window(self):
+        marble = downsample(create_marble(1000), window=(100.0, 200.0))
+
+        observable, operator = marble.layers
+        self.assertEqual(100.0, observable.start)
+        self.assertEqual(200.0, observable.end)
+        self.assertIsNone(observable.completed)
+        self.assertEqual((100.0, 200.0), (operator.start, operator.end))
+        self.assertEqual(
+            101, sum(item.count for item in observable.items))
+        self.assertLessEqual(len(observable.items), default_buckets)
+
+        with self.assertRaises(ValueError):
+            downsample(marble, window=(2.0, 1.0))
+
+    def test_observable_items(self):
+        marble = Marble()
+        parent = Observable(0.0)
+        for index in range(5):
+            parent.on_next_at(index, index * 0.1)
+        parent.on_observable_at(0.25)
+        parent.on_completed_at(10.0)
+        child = Observable(0.25, is_child=True)
+        child.on_completed_at(1.0)
+        marble.add_observable(parent)
+        marble.add_observable(child)
+        marble.build()
+
+        marble = downsample(marble, buckets=2)
+        self.assertEqual(
+            [ObsItem(0.25), Aggregate(5, 2.5, 5.0)],
+            list(marble.layers[0].items))
+        self.assertEqual(
+            [Link(0.25, 0, 0.25, 1)], marble.higher_order_links)
+
+    def test_downsample_again(self):
+        marble = downsample(create_marble(1000), buckets=100)
+        marble = downsample(marble, buckets=10)
+        self.assertEqual(
+            [100] * 10, [item.count for item in marble.layers[0].items])
+
+    def test_unsorted(self):
+        marble = Marble()
+        observable = Observable(0.0)
+        for at in [5.0, 1.0, 9.0, 1.5]:
+            observable.on_next_at('x', at)
+        observable.on_completed_at(10.0)
+        marble.add_observable(observable)
+        marble.build()
+
+        items = list(downsample(marble, buckets=2).layers[0].items)
+        self.assertEqual(
+            [Aggregate(2, 2.5, 5.0), Aggregate(2, 7.5, 5.0)], items)
+
+    def test_render(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            marble = downsample(create_marble(10000))
+            for fmt in ['png', 'svg']:
+                filename = os.path.join(tmpdir, 'marble.' + fmt)
+                render_to_file(marble, filename, default_theme)
+                self.assertGreater(os.path.getsize(filename), 0)
+        finally:
+            shutil.rmtree(tmpdir)
@@ -1,5 +1,8 @@
+import random
+import tracemalloc
 import unittest
-from dooble.marble import Observable, Operator, Marble, Link
+from dooble.marble import Observable, Operator, Marble, Link, LinkList
+from dooble.marble import Item, ObsItem, vectorize_threshold
 
 
 
@@ -27,3 +30,187 @@ class TestMarble(unittest.TestCase):
 
         self.assertEqual(1, len(marble.higher_order_links))
         self.assertEqual(Link(1, 1, 1, 2), marble.higher_order_links[0])
+
+
+class TestIncrementalBuild(unittest.TestCase):
+    def rebuilt(self, marble):
+        fresh = Marble()
+        fresh.layers = list(marble.layers)
+        fresh.build()
+        return fresh
+
+    def check(self, marble):
+        marble.build()
+        fresh = self.rebuilt(marble)
+        self.assertEqual(fresh.higher_order_links, marble.higher_order_links)
+        self.assertEqual(fresh.emission_links, marble.emission_links)
+
+    def test_random_changes(self):
+        rnd = random.Random(7)
+        marble = Marble()
+        observables = []
+        for _ in range(200):
+            action = rnd.random()
+            if action < 0.1:
+                marble.add_operator(Operator(0, 10, 'op'))
+            elif action < 0.3 or not observables:
+                observable = Observable(
+                    rnd.randint(0, 10), is_child=rnd.random() < 0.4)
+                observables.append(observable)
+                marble.add_observable(observable)
+            else:
+                observable = rnd.choice(observables)
+                change = rnd.randint(0, 4)
+                if change == 0:
+                    observable.on_next_at(1, rnd.randint(0, 20))
+                elif change == 1:
+                    observable.on_observable_at(rnd.randint(0, 20))
+                elif change == 2:
+                    observable.set_label('a' if observable.label else None)
+                elif change == 3:
+                    observable.start = rnd.randint(0, 10)
+                else:
+                    observable.is_child = not observable.is_child
+            if rnd.random() < 0.3:
+                self.check(marble)
+        self.check(marble)
+
+    def test_changed_sections_only(self):
+        marble = Marble()
+        for _ in range(3):
+            obs = Observable(0)
+            obs.on_observable_at(1)
+            obs.on_next_at('a', 2)
+            marble.add_observable(obs)
+            marble.add_observable(Observable(1, is_child=True))
+            marble.add_operator(Operator(0, 5, 'op'))
+        last = Observable(0)
+        marble.add_observable(last)
+        marble.build()
+
+        computed = []
+        section_links = marble._section_higher_order_links
+
+        def count(begin, end):
+            computed.append(begin)
+            return section_links(begin, end)
+
+        marble._section_higher_order_links = count
+        marble.build()
+        self.assertEqual([], computed)
+
+        last.on_next_at('b', 3)
+        marble.build()
+        self.assertEqual([9], computed)
+
+        marble.layers[4].on_observable_at(3)
+        marble.build()
+        self.assertEqual([9, 3], computed)
+        self.assertEqual(
+            self.rebuilt(marble).higher_order_links,
+            marble.higher_order_links)
+        # sections only keep the ranges of their links
+        self.assertEqual(
+            [(0, 1), (1, 1), (2, 1), (3, 0)],
+            [s.higher_order_range for s in marble.built_sections])
+
+
+class TestVectorizedBuild(unittest.TestCase):
+    def random_marble(self, rnd, vectorized):
+        marble = Marble(vectorized=vectorized)
+        for _ in range(rnd.randint(0, 40)):
+            action = rnd.random()
+            if action < 0.15:
+                marble.add_operator(Operator(0, 10, 'op'))
+            else:
+                observable = Observable(
+                    rnd.randint(0, 10), is_child=rnd.random() < 0.4)
+                for _ in range(rnd.randint(0, 10)):
+                    if rnd.random() < 0.5:
+                        observable.on_next_at(1, rnd.randint(0, 20))
+                    else:
+                        observable.on_observable_at(rnd.randint(0, 20))
+                if rnd.random() < 0.1:
+                    observable.set_label('a')
+                marble.add_observable(observable)
+        return marble
+
+    def test_same_links(self):
+        for seed in range(200):
+            marbles = [
+                self.random_marble(random.Random(seed), vectorized)
+                for vectorized in (False, True)]
+            for marble in marbles:
+                marble.build()
+            python, vectorized = marbles
+            self.assertEqual(
+                python.higher_order_links, vectorized.higher_order_links)
+            self.assertEqual(python.emission_links, vectorized.emission_links)
+
+    def test_threshold(self):
+        marble = Marble()
+        obs = Observable(0)
+        for at in range(vectorize_threshold):
+            obs.on_next_at(1, at)
+        marble.add_observable(obs)
+        marble.add_operator(Operator(0, 10, 'op'))
+        marble.add_observable(Observable(0))
+        self.assertTrue(marble._is_vectorized(0, 1))
+        self.assertFalse(marble._is_vectorized(2, 3))
+        marble.vectorized = False
+        self.assertFalse(marble._is_vectorized(0, 1))
+
+    def test_array(self):
+        coordinates = [[1, 2, 3, 4], [5, 6, 7, 8]]
+        links = LinkList.from_array(coordinates)
+        self.assertEqual([Link(1, 2, 3, 4), Link(5, 6, 7, 8)], links)
+        self.assertEqual(coordinates, links.as_array().tolist())
+
+
+class TestItemList(unittest.TestCase):
+    def test_items(self):
+        obs = Observable(0)
+        obs.on_next_at('a', 1)
+        obs.on_observable_at(2)
+        obs.on_next_at(3, 3)
+        obs.on_next_at('a', 4)
+
+        self.assertEqual(4, len(obs.items))
+        self.assertEqual(
+            [Item('a', 1), ObsItem(2), Item(3, 3), Item('a', 4)],
+            list(obs.items))
+        self.assertIs(ObsItem, type(obs.items[1]))
+        self.assertEqual(Item('a', 4), obs.items[-1])
+        self.assertEqual(['a', 3], obs.items.values)
+        with self.assertRaises(IndexError):
+            obs.items[4]
+
+    def test_memory(self):
+        count = 100000
+
+        tracemalloc.start()
+        items = [Item('a', float(at)) for at in range(count)]
+        list_size, _ = tracemalloc.get_traced_memory()
+        del items
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        obs = Observable(0)
+        for at in range(count):
+            obs.on_next_at('a', at)
+        array_size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.assertLess(array_size * 4, list_size)
+
+
+class TestLinkList(unittest.TestCase):
+    def test_links(self):
+        links = LinkList([Link(1, 0, 1, 2)])
+        links.append(2.5, 1, 2.5, 3)
+
+        self.assertEqual(2, len(links))
+        self.assertEqual([Link(1, 0, 1, 2), Link(2.5, 1, 2.5, 3)], links)
+        self.assertEqual(Link(2.5, 1, 2.5, 3), links[1])
+        self.assertEqual(
+            [[1, 0, 1, 2], [2.5, 1, 2.5, 3]], links.as_array().tolist())
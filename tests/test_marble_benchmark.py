@@ -0,0 +1,125 @@
+import random
+import time
+import unittest
+
+from dooble.marble import Observable, Operator, Marble, Link
+
+
+def reference_links(parents, childs):
+    links = []
+    for parent in parents:
+        nearest = None
+        for child in childs:
+            if nearest is None or \
+                    abs(parent[0] - child[0]) < abs(parent[0] - nearest[0]):
+                nearest = child
+        if nearest is not None:
+            links.append(Link(parent[0], parent[1], nearest[0], nearest[1]))
+    return links
+
+
+def create_marble(rnd, parent_count, child_count):
+    marble = Marble()
+    marble.add_operator(Operator(0, 10, 'window'))
+
+    width = max(parent_count, child_count)
+    obs = Observable(0)
+    for _ in range(parent_count):
+        obs.on_observable_at(rnd.randint(0, width))
+    obs.on_continued_at(width + 1)
+    marble.add_observable(obs)
+
+    childs = []
+    for _ in range(child_count):
+        obs = Observable(rnd.randint(0, width), is_child=True)
+        obs.on_completed_at(width + 1)
+        childs.append((obs.start, len(marble.layers)))
+        marble.add_observable(obs)
+
+    parents = [(item.at, 1) for item in marble.layers[1].items]
+    return marble, reference_links(parents, childs)
+
+
+class TestMarbleBenchmark(unittest.TestCase):
+    def test_higher_order_links(self):
+        rnd = random.Random(42)
+        for parent_count, child_count in [
+                (1, 1), (10, 3), (3, 10), (100, 100), (200, 800), (800, 200)]:
+            marble, expected = create_marble(rnd, parent_count, child_count)
+            marble.build()
+            self.assertEqual(expected, marble.higher_order_links)
+
+    def test_scaling(self):
+        rnd = random.Random(42)
+        for count in [250, 500, 1000, 2000]:
+            marble, _ = create_marble(rnd, 0, count)
+            for _ in range(count):
+                marble.layers[1].on_observable_at(rnd.randint(0, count))
+
+            start = time.perf_counter()
+            links = marble._compute_higher_order_links()
+            duration = time.perf_counter() - start
+            self.assertEqual(count, len(links))
+
+            parents = [(item.at, 1) for item in marble.layers[1].items]
+            childs = [
+                (layer.start, index)
+                for index, layer in enumerate(marble.layers) if index > 1
+            ]
+            start = time.perf_counter()
+            self.assertEqual(links, reference_links(parents, childs))
+            reference_duration = time.perf_counter() - start
+            print('\n{0} parents, {0} childs: {1:.6f}s '
+                  '(quadratic scan: {2:.6f}s)'.format(
+                      count, duration, reference_duration))
+
+    def test_incremental_build(self):
+        rnd = random.Random(42)
+        marble = Marble()
+        for _ in range(100):
+            marble.add_operator(Operator(0, 10, 'op'))
+            obs = Observable(0)
+            for _ in range(100):
+                obs.on_next_at(1, rnd.randint(0, 100))
+            marble.add_observable(obs)
+        marble.build()
+        last = marble.layers[-1]
+
+        start = time.perf_counter()
+        last.on_next_at(2, 50)
+        marble.build()
+        duration = time.perf_counter() - start
+
+        fresh = Marble()
+        fresh.layers = list(marble.layers)
+        start = time.perf_counter()
+        fresh.build()
+        full_duration = time.perf_counter() - start
+        print('\nincremental build: {:.6f}s (full build: {:.6f}s)'.format(
+            duration, full_duration))
+
+        self.assertEqual(fresh.emission_links, marble.emission_links)
+        self.assertLess(duration, full_duration)
+
+    def test_vectorized_build(self):
+        rnd = random.Random(42)
+        marble = Marble()
+        marble.add_operator(Operator(0, 10, 'op'))
+        obs = Observable(0)
+        for _ in range(50000):
+            obs.on_next_at(1, rnd.randint(0, 100000))
+        marble.add_observable(obs)
+        marble.add_operator(Operator(0, 10, 'op'))
+
+        durations = []
+        links = []
+        for vectorized in (False, True):
+            marble.vectorized = vectorized
+            start = time.perf_counter()
+            links.append(marble._compute_emmision_links())
+            durations.append(time.perf_counter() - start)
+        print('\n{} emission links: {:.6f}s (vectorized: {:.6f}s)'.format(
+            len(links[0]), *durations))
+
+        self.assertEqual(100000, len(links[1]))
+        self.assertEqual(links[0].coordinates, links[1].coordinates)
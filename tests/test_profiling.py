@@ -0,0 +1,87 @@
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+
+from dooble.batch import render_files
+from dooble.dooble import default_theme
+from dooble.profiling import Profiler, Timing, stages, format_summary
+
+
+examples = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_stage(self):
+        timings = []
+        profiler = Profiler(memory=True, hooks=[timings.append])
+        with profiler.stage('allocate'):
+            data = bytearray(1024 * 1024)
+        del data
+
+        self.assertEqual(profiler.timings, timings)
+        timing, = timings
+        self.assertEqual('allocate', timing.stage)
+        self.assertGreater(timing.duration, 0.0)
+        self.assertGreaterEqual(timing.peak_memory, 1024 * 1024)
+
+    def test_stage_error(self):
+        profiler = Profiler()
+        with self.assertRaises(ValueError):
+            with profiler.stage('fail'):
+                raise ValueError()
+        self.assertEqual(['fail'], [t.stage for t in profiler.timings])
+        self.assertIsNone(profiler.timings[0].peak_memory)
+
+    def test_summary(self):
+        profiler = Profiler()
+        for timing in [
+                Timing('other', 1.0, None),
+                Timing('render_to_file', 3.0, 10),
+                Timing('Idl.parse', 1.0, None),
+                Timing('render_to_file', 1.0, 20)]:
+            profiler.record(timing)
+
+        summary = profiler.summary()
+        self.assertEqual(
+            ['Idl.parse', 'render_to_file', 'other'],
+            [s['stage'] for s in summary])
+        self.assertEqual(
+            {'stage': 'render_to_file', 'count': 2, 'total': 4.0,
+             'mean': 2.0, 'max': 3.0, 'peak_memory': 20},
+            summary[1])
+        self.assertEqual(4, len(format_summary(summary).splitlines()))
+
+    def test_render_files(self):
+        inputs = [os.path.join(examples, n + '.txt') for n in ['map', 'catch']]
+        outputs = [os.path.join(self.tmpdir, n + '.svg') for n in 'ab']
+        profiler = Profiler(profile=True)
+        results = list(render_files(
+            inputs, outputs, default_theme, profiler=profiler))
+
+        for result in results:
+            self.assertEqual(stages, [t.stage for t in result.timings])
+        self.assertEqual(2 * len(stages), len(profiler.timings))
+
+        filenames = profiler.dump_profiles(os.path.join(self.tmpdir, 'prof'))
+        self.assertEqual(len(stages), len(filenames))
+        pstats.Stats(filenames[0])
+
+    def test_render_files_parallel(self):
+        inputs = [os.path.join(examples, n + '.txt') for n in ['map', 'catch']]
+        outputs = [os.path.join(self.tmpdir, n + '.svg') for n in 'ab']
+        profiler = Profiler()
+        results = list(render_files(
+            inputs, outputs, default_theme, jobs=2, profiler=profiler))
+
+        self.assertEqual(2 * len(stages), len(profiler.timings))
+        self.assertEqual(
+            sorted(t for r in results for t in r.timings),
+            sorted(profiler.timings))
@@ -0,0 +1,210 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import matplotlib.image
+from matplotlib.axes import Axes
+import numpy as np
+
+from dooble.idl import Idl
+from dooble.dooble import create_marble_from_ast, default_theme
+from dooble.layout import create_layout
+from dooble.render import render_to_file, render_many, render_to_bytes, \
+    render_to_buffer, new_figure, draw, area, end_area
+
+
+examples = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+
+def load_example(name):
+    with open(os.path.join(examples, name + '.txt')) as idl_file:
+        ast = Idl(engine='fast').parse(idl_file.read())
+    return create_marble_from_ast(ast)
+
+
+def draw_artists(fig, marble, theme):
+    """Draws marble with one artist per element, in the order of the layers,
+    as diagrams were drawn before dooble.render.draw used collections, and
+    framed by the limits of its layout.
+    """
+    from matplotlib.patches import Rectangle
+
+    layout = create_layout(marble)
+    fig.clear()
+    fig.set_size_inches(layout.width, layout.height)
+    ax = fig.add_subplot(1, 1, 1)
+
+    def rows(name, columns, layer_index):
+        layers = getattr(layout, name[:-1] + '_layers')
+        return [row for row, layer in zip(layout.as_array(name, columns),
+                                          layers)
+                if layer == layer_index]
+
+    for x1, y1, x2, y2 in layout.as_array('higher_order_links', 4):
+        ax.plot([x1, x2], [y1, y2], color=theme.timeline_color,
+                linestyle='-', linewidth=2, zorder=0)
+
+    for (x1, y1, x2, y2), (x, y) in zip(
+            layout.as_array('emission_links', 4),
+            layout.as_array('arrows', 2)):
+        ax.plot([x1, x2], [y1, y2], color=theme.emission_color,
+                linestyle=':', linewidth=1, zorder=0)
+        ax.scatter([x], [y], color=theme.emission_color, marker='v',
+                   linewidth=1)
+
+    timelines = zip(
+        layout.timeline_layers, layout.as_array('timelines', 4),
+        layout.as_array('ends', 2), layout.end_kinds)
+    timelines = {layer: rest for layer, *rest in timelines}
+    for layer_index in range(layout.layer_count):
+        if layer_index in timelines:
+            (x1, y1, x2, y2), (x, y), kind = timelines[layer_index]
+            ax.plot([x1, x2], [y1, y2], color=theme.timeline_color,
+                    linestyle='-', linewidth=2, zorder=0)
+            if kind == '>':
+                ax.scatter([x], [y], s=end_area, color=theme.timeline_color,
+                           marker=kind)
+            else:
+                ax.scatter([x], [y], s=end_area, color=theme.timeline_color,
+                           marker=kind, linewidth=2)
+
+            items = rows('items', 2, layer_index)
+            if items:
+                ax.scatter(
+                    [x for x, _ in items], [y for _, y in items], s=area,
+                    c=None, edgecolors=theme.timeline_color,
+                    color=theme.item_color, alpha=1.0, linewidth=2)
+            for x, y, width, height in rows('aggregates', 4, layer_index):
+                ax.add_patch(Rectangle(
+                    (x, y), width, height, alpha=1,
+                    edgecolor=theme.timeline_color,
+                    facecolor=theme.item_color, linewidth=2))
+            for x, y in rows('labels', 2, layer_index):
+                ax.scatter(
+                    [x], [y], s=area, c=None,
+                    edgecolors=theme.operator_edge_color,
+                    color=theme.label_color, alpha=1.0, linewidth=2)
+        else:
+            for x, y, width, height in rows('operators', 4, layer_index):
+                ax.add_patch(Rectangle(
+                    (x, y), width, height, alpha=1,
+                    edgecolor=theme.operator_edge_color,
+                    facecolor=theme.operator_color, linewidth=2))
+
+    ax.set_xlim(layout.x_limits)
+    ax.set_ylim(layout.y_limits)
+    for x, y, text in layout.texts:
+        ax.text(x, y, text, horizontalalignment='center',
+                verticalalignment='center')
+    ax.set_axis_off()
+
+
+def read_image(data):
+    return matplotlib.image.imread(io.BytesIO(data))
+
+
+def read(filename):
+    with open(filename, 'rb') as f:
+        return f.read()
+
+
+class TestRender(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_render_many(self):
+        names = ['map', 'window', 'catch']
+        filenames = [os.path.join(self.tmpdir, n + '.png') for n in names]
+        render_many(
+            (load_example(n) for n in names), filenames, default_theme)
+
+        for name, filename in zip(names, filenames):
+            expected = os.path.join(self.tmpdir, name + '-single.png')
+            render_to_file(load_example(name), expected, default_theme)
+            self.assertEqual(read(expected), read(filename))
+
+    def test_examples(self):
+        # collections are drawn as one artist per element would be
+        for name in ['map', 'window', 'catch']:
+            marble = load_example(name)
+            fig = new_figure()
+            draw_artists(fig, marble, default_theme)
+            buffer = io.BytesIO()
+            fig.savefig(buffer, dpi=fig.dpi)
+
+            expected = read_image(buffer.getvalue())
+            actual = read_image(render_to_bytes(marble, default_theme))
+            self.assertEqual(expected.shape, actual.shape)
+            self.assertTrue(np.array_equal(expected, actual), name)
+
+    def test_layout_limits(self):
+        # the same framing as the SVG and raster backends
+        marble = load_example('window')
+        layout = create_layout(marble)
+        fig = new_figure()
+        draw(fig, layout, default_theme)
+        ax = fig.axes[0]
+        self.assertEqual(layout.x_limits, ax.get_xlim())
+        self.assertEqual(layout.y_limits, ax.get_ylim())
+
+        draw(fig, layout, default_theme, x_limits=(2, 8))
+        self.assertEqual((2, 8), fig.axes[0].get_xlim())
+
+    def test_autoscale_once(self):
+        items = '-'.join('a' * 500)
+        ast = Idl(engine='fast').parse(
+            '+-' + items + '-->\n[ map ]\n-' + items + '-->')
+        marble = create_marble_from_ast(ast)
+        self.assertEqual(1000, len(marble.emission_links))
+        with mock.patch.object(
+                Axes, 'autoscale_view', autospec=True,
+                side_effect=Axes.autoscale_view) as autoscale_view:
+            draw(new_figure(), marble, default_theme)
+        # at most once per collection, not once per element
+        self.assertLess(autoscale_view.call_count, 10)
+
+
+class TestRenderToBytes(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_same_as_file(self):
+        marble = load_example('window')
+        for fmt in ['png', 'svg']:
+            filename = os.path.join(self.tmpdir, 'window.' + fmt)
+            render_to_file(marble, filename, default_theme)
+            self.assertEqual(
+                read(filename),
+                render_to_bytes(marble, default_theme, fmt=fmt))
+
+    def test_render_to_buffer(self):
+        buffer = io.BytesIO()
+        buffer.write(b'header')
+        render_to_buffer(
+            load_example('map'), buffer, default_theme, fmt='png', dpi=50)
+        content = buffer.getvalue()
+        self.assertTrue(content.startswith(b'header\x89PNG'))
+
+        image = matplotlib.image.imread(io.BytesIO(content[6:]))
+        self.assertEqual(320, image.shape[1])
+
+    def test_threads(self):
+        names = ['map', 'window', 'catch'] * 4
+        marbles = [load_example(n) for n in names]
+        expected = [render_to_bytes(m, default_theme) for m in marbles]
+
+        with ThreadPoolExecutor(4) as executor:
+            results = list(executor.map(
+                lambda marble: render_to_bytes(marble, default_theme),
+                marbles))
+        self.assertEqual(expected, results)
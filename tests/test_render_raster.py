@@ -0,0 +1,100 @@
+import io
+import os
+import subprocess
+import sys
+import shutil
+import tempfile
+import unittest
+
+from PIL import Image
+
+from dooble.idl import Idl
+from dooble.dooble import create_marble_from_ast, default_theme
+from dooble.batch import render_files
+from dooble.render import render_to_bytes, render_to_file
+from dooble.render_raster import render_to_image, dashes, color
+
+
+def create_marble(text):
+    return create_marble_from_ast(Idl(engine='fast').parse(text))
+
+
+catch = '''--1--2--3--*
+         a-7-8-|
+[   catch(a)   ]
+--1--2--3--7-8-|
+'''
+
+
+class TestRenderRaster(unittest.TestCase):
+    def test_image(self):
+        marble = create_marble(catch)
+        image = render_to_image(marble, default_theme)
+        self.assertEqual((640, 280), image.size)
+        colors = {c for _, c in image.getcolors(640 * 280)}
+        for name in ['timeline_color', 'item_color', 'operator_color']:
+            self.assertIn(color(getattr(default_theme, name)), colors)
+        # texts
+        self.assertIn((0, 0, 0), colors)
+
+        image = render_to_image(marble, default_theme, dpi=200)
+        self.assertEqual((1280, 560), image.size)
+
+    def test_clip(self):
+        marble = create_marble('--1--2--3--4--5-->')
+        image = render_to_image(marble, default_theme, x_limits=(4, 8))
+        white = (0xFF, 0xFF, 0xFF)
+        self.assertEqual(
+            [white], [c for _, c in image.crop((0, 0, 80, 70)).getcolors()])
+        self.assertNotEqual(
+            [white],
+            [c for _, c in image.crop((80, 0, 576, 70)).getcolors()])
+
+    def test_dashes(self):
+        self.assertEqual(
+            [(0, 0, 0, 1), (0, 3, 0, 4), (0, 6, 0, 6.5)],
+            list(dashes(0, 0, 0, 6.5, (1, 2))))
+
+    def test_backend(self):
+        marble = create_marble(catch)
+        data = render_to_bytes(marble, default_theme, backend='raster')
+        image = Image.open(io.BytesIO(data))
+        self.assertEqual('PNG', image.format)
+        self.assertEqual((640, 280), image.size)
+        self.assertNotEqual(data, render_to_bytes(marble, default_theme))
+        with self.assertRaises(ValueError):
+            render_to_bytes(marble, default_theme, backend='cairo')
+
+    def test_render_files(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            examples = os.path.join(
+                os.path.dirname(__file__), '..', 'examples')
+            inputs = [os.path.join(examples, n + '.txt')
+                      for n in ['map', 'catch']]
+            outputs = [os.path.join(tmpdir, n + '.png')
+                       for n in ['map', 'catch']]
+            results = list(render_files(
+                inputs, outputs, default_theme, backend='raster'))
+            self.assertEqual([None, None], [r.error for r in results])
+
+            marble = create_marble(catch)
+            render_to_file(marble, outputs[1], default_theme, backend='raster')
+            with open(outputs[1], 'rb') as image_file:
+                self.assertEqual(
+                    render_to_bytes(marble, default_theme, backend='raster'),
+                    image_file.read())
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_no_matplotlib(self):
+        subprocess.check_call([
+            sys.executable, '-c',
+            'import sys; from dooble.render import render_to_bytes; '
+            'from dooble.batch import create_marble; '
+            'from dooble.idl import Idl; '
+            'from dooble.dooble import default_theme; '
+            'render_to_bytes(create_marble(Idl(engine="fast"), "-a-|"), '
+            'default_theme, backend="raster"); '
+            'assert "matplotlib" not in sys.modules'
+        ], cwd=os.path.join(os.path.dirname(__file__), '..'))
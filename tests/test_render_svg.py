@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+import shutil
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+
+from dooble.idl import Idl
+from dooble.dooble import create_marble_from_ast, default_theme
+from dooble.render import render_to_file
+from dooble.render_svg import render_to_string
+
+
+svg = '{http://www.w3.org/2000/svg}'
+
+
+def create_marble(text):
+    return create_marble_from_ast(Idl(engine='fast').parse(text))
+
+
+class TestRenderSvg(unittest.TestCase):
+    def test_elements(self):
+        marble = create_marble('''--1--2--3--*
+         a-7-8-|
+[   catch(a)   ]
+--1--2--3--7-8-|
+''')
+        root = ET.fromstring(render_to_string(marble, default_theme))
+
+        self.assertEqual(svg + 'svg', root.tag)
+        circles = root.findall('.//' + svg + 'circle')
+        self.assertEqual(3 + 2 + 1 + 5, len(circles))
+        texts = [t.text for t in root.findall('.//' + svg + 'text')]
+        self.assertIn('catch(a)', texts)
+        self.assertIn('a', texts)
+        self.assertEqual(['1', '2', '3', '7', '8'], texts[-5:])
+
+    def test_escape(self):
+        marble = create_marble('-a->\n[ i <> 2 ]\n')
+        root = ET.fromstring(render_to_string(marble, default_theme))
+        texts = [t.text for t in root.findall('.//' + svg + 'text')]
+        self.assertIn('i <> 2', texts)
+
+    def test_render_to_file(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, 'map.svg')
+            marble = create_marble('--1--2-->\n[ map(i: i*2) ]\n--2--4-->')
+            render_to_file(marble, filename, default_theme)
+            with open(filename) as svg_file:
+                self.assertEqual(
+                    render_to_string(marble, default_theme), svg_file.read())
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_no_matplotlib(self):
+        subprocess.check_call([
+            sys.executable, '-c',
+            'import sys; import dooble.render_svg; '
+            'assert "matplotlib" not in sys.modules'
+        ], cwd=os.path.join(os.path.dirname(__file__), '..'))
@@ -0,0 +1,83 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from dooble.dooble import default_theme
+from dooble.sections import Section, read_sections, output_path, \
+    is_template, render_sections
+
+
+document = '''
+=== map
+--1--2--3-->
+[ map(i: i*2) ]
+--2--4--6-->
+
+=== empty
+====
+--a-b-|
+===== filter
+--1--2--3-->'''
+
+
+class TestSections(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_read_sections(self):
+        sections = list(read_sections(io.StringIO(document)))
+        self.assertEqual(
+            [('map', 1), ('2', 2), ('filter', 3)],
+            [(s.name, s.index) for s in sections])
+        self.assertEqual(
+            '--1--2--3-->\n[ map(i: i*2) ]\n--2--4--6-->\n\n',
+            sections[0].text)
+        self.assertEqual('--1--2--3-->\n', sections[2].text)
+
+    def test_first_section(self):
+        sections = list(read_sections(['--a-|\n', '=== b\n', '--b-|\n']))
+        self.assertEqual(
+            [Section('1', 1, '--a-|\n'), Section('b', 2, '--b-|\n')],
+            sections)
+
+    def test_lazy(self):
+        def lines():
+            yield '=== a\n'
+            yield '--a-|\n'
+            yield '=== b\n'
+            raise AssertionError('read too far')
+
+        self.assertEqual('a', next(read_sections(lines())).name)
+
+    def test_invalid_name(self):
+        with self.assertRaises(ValueError) as cm:
+            list(read_sections(['--a-|\n', '=== ../a\n', '--b-|\n']))
+        self.assertIn('line 2', str(cm.exception))
+
+        with self.assertRaises(ValueError):
+            list(read_sections(['=== a\n', '--a-|\n', '=== a\n', '-|\n']))
+
+    def test_output_path(self):
+        section = Section('map', 3, '')
+        self.assertTrue(is_template('build/{name}.png'))
+        self.assertFalse(is_template('build/map.png'))
+        self.assertEqual(
+            'build/03-map.png', output_path('build/0{index}-{name}.png',
+                                            section))
+
+    def test_render_sections(self):
+        template = os.path.join(self.tmpdir, 'out', '{name}.svg')
+        sections = read_sections(io.StringIO(document + '\n=== bad\n--1-\n'))
+        results = list(render_sections(sections, template, default_theme))
+
+        self.assertEqual(
+            ['map', '2', 'filter', 'bad'], [r.input for r in results])
+        for result in results[:3]:
+            self.assertIsNone(result.error)
+            self.assertTrue(os.path.exists(result.output))
+        self.assertIn('ParseError', results[3].error)
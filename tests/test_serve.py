@@ -0,0 +1,147 @@
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from http.client import HTTPConnection
+
+from dooble.serve import RenderService, ServiceBusy, RenderError, \
+    RenderTimeout, create_server
+
+
+examples = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+
+class UnixHTTPConnection(HTTPConnection):
+    def __init__(self, path):
+        super(UnixHTTPConnection, self).__init__('localhost')
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+class TestServe(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.service = RenderService(workers=1, queue_size=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.service.close()
+
+    def setUp(self):
+        with open(os.path.join(examples, 'window.txt'), 'rb') as idl_file:
+            self.text = idl_file.read()
+
+    def start(self, **kwargs):
+        server = create_server(self.service, **kwargs)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+
+        def stop():
+            server.shutdown()
+            server.server_close()
+            thread.join()
+        self.addCleanup(stop)
+        return server
+
+    def request(self, connection, method, path, body=None):
+        connection.request(method, path, body=body)
+        response = connection.getresponse()
+        return response.status, response.getheader('Content-Type'), \
+            response.read()
+
+    def test_http(self):
+        server = self.start(host='127.0.0.1', port=0)
+        connection = HTTPConnection('127.0.0.1', server.server_address[1])
+
+        status, content_type, body = self.request(
+            connection, 'POST', '/render', self.text)
+        self.assertEqual(200, status)
+        self.assertEqual('image/png', content_type)
+        self.assertTrue(body.startswith(b'\x89PNG'))
+
+        status, content_type, body = self.request(
+            connection, 'POST', '/render?format=svg', self.text)
+        self.assertEqual(200, status)
+        self.assertEqual('image/svg+xml', content_type)
+        self.assertIn(b'<svg', body)
+
+        status, _, body = self.request(
+            connection, 'POST', '/render', b'--a--')
+        self.assertEqual(400, status)
+        self.assertIn(b'ParseError', body)
+
+        status, _, _ = self.request(
+            connection, 'POST', '/render?format=gif', self.text)
+        self.assertEqual(400, status)
+
+        for dpi in ['5000', '0', '-100']:
+            status, _, _ = self.request(
+                connection, 'POST', '/render?dpi=' + dpi, self.text)
+            self.assertEqual(400, status)
+
+        connection.putrequest('POST', '/render')
+        connection.putheader('Content-Length', '-1')
+        connection.endheaders()
+        self.assertEqual(400, connection.getresponse().status)
+        connection.close()
+
+        status, content_type, body = self.request(
+            connection, 'GET', '/metrics')
+        self.assertEqual(200, status)
+        metrics = json.loads(body.decode())
+        self.assertGreaterEqual(metrics['requests'], 3)
+        self.assertGreaterEqual(metrics['errors'], 1)
+        self.assertEqual(0, metrics['queue_depth'])
+        self.assertGreater(metrics['latency']['p50'], 0.0)
+
+    def test_unix_socket(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'dooble.sock')
+        self.start(socket_path=path)
+
+        status, _, body = self.request(
+            UnixHTTPConnection(path), 'POST', '/render?format=svg',
+            self.text)
+        self.assertEqual(200, status)
+        self.assertIn(b'<svg', body)
+
+    def test_backpressure(self):
+        # both the worker and the queue are busy
+        self.service.slots.acquire()
+        self.service.slots.acquire()
+        try:
+            rejected = self.service.metrics.rejected
+            with self.assertRaises(ServiceBusy):
+                self.service.render(self.text.decode())
+            self.assertEqual(rejected + 1, self.service.metrics.rejected)
+        finally:
+            self.service.slots.release()
+            self.service.slots.release()
+
+        self.assertTrue(self.service.render(self.text.decode(), 'svg'))
+        with self.assertRaises(RenderError):
+            self.service.render('--a--')
+
+    def test_timeout(self):
+        service = RenderService(workers=1, queue_size=0, timeout=0.001)
+        self.addCleanup(service.close)
+        with self.assertRaises(RenderTimeout):
+            service.render(self.text.decode())
+        # the worker is still rendering the abandoned request
+        with self.assertRaises(ServiceBusy):
+            service.render(self.text.decode())
+
+        deadline = time.time() + 30
+        while service.metrics.pending and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(0, service.metrics.pending)
+        service.timeout = 30.0
+        self.assertTrue(service.render(self.text.decode(), 'svg'))
@@ -0,0 +1,130 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+
+from dooble.dooble import default_theme
+from dooble.marble import Marble, Observable, Operator, Item, ObsItem, \
+    Link, LinkList
+from dooble.render_svg import render_to_string
+from dooble.tiles import TileIndex, tiles, tile_filename, render_tiles
+
+
+svg = '{http://www.w3.org/2000/svg}'
+
+
+def create_marble(count):
+    marble = Marble()
+    observable = Observable(0.0)
+    for index in range(count):
+        observable.on_next_at(index, float(index))
+    observable.on_completed_at(float(count))
+    marble.add_observable(observable)
+    marble.add_operator(Operator(0.0, float(count), 'map(i: i)'))
+    marble.build()
+    return marble
+
+
+class TestTiles(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_tile(self):
+        index = TileIndex(create_marble(100))
+        tile = index.tile(10.0, 20.0)
+
+        observable, operator = tile.layers
+        self.assertEqual(
+            [Item(i, float(i)) for i in range(10, 21)],
+            list(observable.items))
+        self.assertEqual((10.0, 20.0), (observable.start, observable.end))
+        self.assertIsNone(observable.completed)
+        self.assertEqual((10.0, 20.0), (operator.start, operator.end))
+        self.assertEqual(
+            [Link(float(i), 0, float(i), 1) for i in range(10, 21)],
+            tile.emission_links)
+
+        tile = index.tile(95.0, 105.0)
+        self.assertEqual(100.0, tile.layers[0].completed)
+
+    def test_higher_order_links(self):
+        marble = Marble()
+        parent = Observable(0.0)
+        parent.on_observable_at(5.0)
+        parent.on_completed_at(50.0)
+        child = Observable(8.0, is_child=True)
+        child.on_completed_at(9.0)
+        marble.add_observable(parent)
+        marble.add_observable(child)
+        marble.build()
+
+        index = TileIndex(marble)
+        self.assertEqual(
+            [ObsItem(5.0)], list(index.tile(0.0, 10.0).layers[0].items))
+        self.assertEqual(
+            [Link(5.0, 0, 8.0, 1)], index.tile(6.0, 7.0).higher_order_links)
+        self.assertEqual([], index.tile(20.0, 30.0).higher_order_links)
+
+    def test_higher_order_link_index(self):
+        rnd = random.Random(42)
+        marble = create_marble(10)
+        links = []
+        for _ in range(200):
+            from_x = rnd.uniform(0.0, 100.0)
+            links.append(Link(from_x, 0, from_x + rnd.uniform(-5, 5), 1))
+        marble.higher_order_links = LinkList(links)
+
+        index = TileIndex(marble)
+        for start in range(-10, 110, 7):
+            end = start + 7.5
+            self.assertEqual(
+                sorted(link for link in links
+                       if min(link.from_x, link.to_x) <= end
+                       and max(link.from_x, link.to_x) >= start),
+                sorted(index.tile(start, end).higher_order_links))
+
+    def test_tiles(self):
+        limits = list(tiles(TileIndex(create_marble(100)), 30.0))
+        self.assertEqual(4, len(limits))
+        self.assertLess(limits[0][0], 0.0)
+        self.assertGreater(limits[-1][1], 100.0)
+        for (_, end), (start, _) in zip(limits, limits[1:]):
+            self.assertEqual(end, start)
+
+    def test_tile_filename(self):
+        self.assertEqual('a/b-1.png', tile_filename('a/b.png', 0, 9))
+        self.assertEqual('a/b-010.png', tile_filename('a/b.png', 9, 120))
+
+    def test_clip_svg(self):
+        marble = TileIndex(create_marble(100)).tile(9.0, 21.0)
+        root = ET.fromstring(render_to_string(
+            marble, default_theme, x_limits=(10.0, 20.0)))
+        self.assertEqual(1, len(root.findall('.//' + svg + 'clipPath')))
+
+    def test_render_tiles(self):
+        marble = create_marble(100)
+        for fmt in ['png', 'svg']:
+            filenames = render_tiles(
+                marble, os.path.join(self.tmpdir, 'marble.' + fmt),
+                default_theme, 25.0)
+            self.assertEqual(
+                [os.path.join(self.tmpdir, 'marble-{}.{}'.format(i, fmt))
+                 for i in range(1, 6)],
+                filenames)
+            for filename in filenames:
+                self.assertTrue(os.path.exists(filename))
+
+    def test_render_pdf(self):
+        filename = os.path.join(self.tmpdir, 'marble.pdf')
+        filenames = render_tiles(create_marble(100), filename,
+                                 default_theme, 25.0)
+        self.assertEqual([filename], filenames)
+        with open(filename, 'rb') as pdf_file:
+            content = pdf_file.read()
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertIn(b'/Count 5', content)
@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from dooble.dooble import default_theme
+from dooble.watch import Watcher, watch
+
+
+def write(filename, content):
+    with open(filename, 'w') as f:
+        f.write(content)
+
+
+class TestWatch(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.map = os.path.join(self.tmpdir, 'map.txt')
+        write(self.map, '--1--2-->\n[ map ]\n--2--4-->\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_poll(self):
+        watcher = Watcher(self.tmpdir, debounce=1.0)
+        self.assertEqual([], watcher.poll(0.0))
+
+        write(self.map, '--1--2--3-->\n')
+        self.assertEqual([], watcher.poll(10.0))
+        write(self.map, '--1--2--3--4-->\n')
+        self.assertEqual([], watcher.poll(10.5))
+        self.assertEqual([self.map], watcher.poll(11.5))
+        self.assertEqual([], watcher.poll(20.0))
+
+        other = os.path.join(self.tmpdir, 'other.txt')
+        write(other, '-a->\n')
+        write(os.path.join(self.tmpdir, 'notes.rst'), 'notes\n')
+        self.assertEqual([], watcher.poll(30.0))
+        self.assertEqual([other], watcher.poll(31.0))
+
+    def test_watch(self):
+        output_dir = os.path.join(self.tmpdir, 'out')
+        polls = []
+
+        def stop():
+            polls.append(None)
+            if len(polls) == 2:
+                write(self.map, '--1--2--3-->\n')
+            return len(polls) > 4
+
+        watch(
+            self.tmpdir, output_dir, 'svg', default_theme,
+            interval=0.01, debounce=0.01, stop=stop)
+
+        output = os.path.join(output_dir, 'map.svg')
+        with open(output) as f:
+            self.assertEqual(3, f.read().count('<circle'))